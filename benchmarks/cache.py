@@ -0,0 +1,31 @@
+"""Compare :meth:`xtractmime.Sniffer.sniff` with and without a result cache
+on bodies that repeat, as templated pages do in a crawl.
+
+Run with ``python benchmarks/cache.py`` from the root of the repository.
+"""
+import timeit
+
+import corpus
+
+from xtractmime import Sniffer
+
+
+def main():
+    cases = [
+        (name, body, options)
+        for name, body, options in corpus.build()
+        if set(options) <= {"content_types", "no_sniff"}
+    ]
+    for cache_size in (0, 1024):
+        sniffer = Sniffer(cache_size=cache_size)
+        print(f"cache_size={cache_size}")
+        for name, body, options in cases:
+            timer = timeit.Timer(lambda: sniffer.sniff(body, **options))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            print(f"  {name:40} {best * 1e6:8.2f} us")
+        print(f"  hit rate: {sniffer.cache_info().hit_rate:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Generated inputs for the benchmark suite, one per decision branch of
+:func:`xtractmime.extract_mime`.
+
+The corpus is built from a fixed random seed, so it is identical on every
+run and does not need any file.
+"""
+import random
+from typing import Any, Dict, List, Tuple
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH
+
+Case = Tuple[str, bytes, Dict[str, Any]]
+
+_random = random.Random(0)
+
+
+def _text(size: int) -> bytes:
+    words = [b"lorem", b"ipsum", b"dolor", b"sit", b"amet", b"\n"]
+    text = b""
+    while len(text) < size:
+        text += _random.choice(words) + b" "
+    return text[:size]
+
+
+def _binary(size: int) -> bytes:
+    return bytes(_random.randrange(256) for _ in range(size))
+
+
+def _header(prefix: bytes) -> bytes:
+    return prefix + _binary(RESOURCE_HEADER_BUFFER_LENGTH - len(prefix))
+
+
+def _mp3_frames() -> bytes:
+    with open("tests/files/NonID3.mp3", "rb") as input_file:
+        return input_file.read(RESOURCE_HEADER_BUFFER_LENGTH)
+
+
+def _mp4() -> bytes:
+    box = b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2mp41"
+    return box + _binary(RESOURCE_HEADER_BUFFER_LENGTH - len(box))
+
+
+def _webm() -> bytes:
+    ebml = bytes.fromhex("1a45dfa3 9f 4286 81 01 42f7 81 01 42f2 81 04 42f3 81 08 4282 84")
+    return ebml + b"webm" + _binary(100)
+
+
+def _extra_types(count: int) -> Tuple[Tuple[bytes, bytes, None, bytes], ...]:
+    return tuple(
+        (b"X%04d" % index, b"\xff" * 5, None, b"application/x-test-%d" % index)
+        for index in range(count)
+    )
+
+
+def build() -> List[Case]:
+    html = (
+        b"<!DOCTYPE html>\n<html><head><title>Test</title></head><body>"
+        + _text(2000)
+        + b"</body></html>"
+    )
+    rss_after_comments = (
+        b'<?xml version="1.0"?>\n' + b"<!-- " + _text(800) + b" -->\n" + b'<rss version="2.0">'
+    )
+    long_comment = b"<!--" + _text(RESOURCE_HEADER_BUFFER_LENGTH) + b"-->"
+    worst_case_rdf = (
+        b"<rdf:RDF "
+        + _text(RESOURCE_HEADER_BUFFER_LENGTH - 40)
+        + (b'xmlns="http://purl.org/rss/1.0/"')
+    )
+    cases: List[Case] = [
+        # Unknown MIME type, one case per pattern group.
+        ("unknown/text: html", html, {}),
+        ("unknown/text: pdf", b"%PDF-1.7\n" + _binary(2000), {}),
+        ("unknown/text: leading whitespace", b"\n" * 1400 + b"<html>", {}),
+        ("unknown/extra: postscript", b"%!PS-Adobe-3.0\n" + _text(2000), {}),
+        ("unknown/image: png", _header(b"\x89PNG\r\n\x1a\n"), {}),
+        ("unknown/image: jpeg", _header(b"\xff\xd8\xff\xe0"), {}),
+        ("unknown/audio-video: ogg", _header(b"OggS\x00"), {}),
+        ("unknown/audio-video: mp4", _mp4(), {}),
+        ("unknown/audio-video: webm", _webm(), {}),
+        ("unknown/audio-video: mp3 without ID3", _mp3_frames(), {}),
+        ("unknown/archive: zip", _header(b"PK\x03\x04"), {}),
+        ("unknown/fallback: text/plain", _text(5000), {}),
+        ("unknown/fallback: octet-stream", _header(b"\x7f\x01"), {}),
+        # Supplied MIME type.
+        ("supplied: no_sniff", html, {"content_types": (b"text/html",), "no_sniff": True}),
+        ("supplied: xml", rss_after_comments, {"content_types": (b"application/rss+xml",)}),
+        ("apache: text", _text(5000), {"content_types": (b"text/plain",)}),
+        ("apache: binary", _header(b"\x7fELF"), {"content_types": (b"text/plain",)}),
+        ("apache: bom", b"\xef\xbb\xbf" + _text(2000), {"content_types": (b"text/plain",)}),
+        ("html: html page", html, {"content_types": (b"text/html",)}),
+        ("html: rss after comments", rss_after_comments, {"content_types": (b"text/html",)}),
+        ("html: long comment", long_comment, {"content_types": (b"text/html",)}),
+        ("html: worst-case rdf:RDF", worst_case_rdf, {"content_types": (b"text/html",)}),
+        (
+            "supported: image",
+            _header(b"GIF89a"),
+            {"content_types": (b"image/png",), "supported_types": {b"image/gif"}},
+        ),
+        (
+            "supported: video",
+            _mp4(),
+            {"content_types": (b"video/webm",), "supported_types": {b"video/mp4"}},
+        ),
+    ]
+    for count in (1, 10, 100, 1000):
+        cases.append((f"extra_types: {count}", _text(2000), {"extra_types": _extra_types(count)}))
+    return cases
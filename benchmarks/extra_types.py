@@ -0,0 +1,36 @@
+"""Measure the cost of ``extra_types`` passed to :func:`xtractmime.extract_mime`
+on every call, compared to a :class:`xtractmime.Sniffer` that compiles them once.
+
+Run with ``python benchmarks/extra_types.py``.
+"""
+import timeit
+
+from xtractmime import Sniffer, extract_mime
+
+BODIES = {
+    "html": b"<html>" + b"x" * 100,
+    "text": b"hello",
+}
+
+
+def main():
+    for count in (0, 1, 10, 100):
+        extra_types = [
+            (b"x%03d" % index, b"\xff\xff\xff\xff", None, b"application/x-%03d" % index)
+            for index in range(count)
+        ]
+        sniffer = Sniffer(extra_types=tuple(extra_types))
+        for name, body in BODIES.items():
+            functions = {
+                "extract_mime": lambda: extract_mime(body, extra_types=extra_types),
+                "Sniffer.sniff": lambda: sniffer.sniff(body),
+            }
+            for label, function in functions.items():
+                timer = timeit.Timer(function)
+                number, _ = timer.autorange()
+                best = min(timer.repeat(repeat=5, number=number)) / number
+                print(f"{count:4} extra types {name:5} {label:14} {best * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Measure the time to import :mod:`xtractmime` in a new interpreter, and the
+time of the first call of :func:`xtractmime.extract_mime`, which builds what
+the import leaves to build lazily.
+
+Run with ``python benchmarks/import_time.py [RUNS]`` from the root of the
+repository. The slowest modules imported are listed, as reported by
+``python -X importtime``.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+_FIRST_CALL = """
+import time
+start = time.perf_counter()
+import xtractmime
+imported = time.perf_counter()
+xtractmime.extract_mime(b"<html>", content_types=(b"text/html",))
+xtractmime.extract_mime(b"\\x00\\x01")
+print(imported - start, time.perf_counter() - imported)
+"""
+
+
+def _run(*args: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def _import_times():
+    """Return the cumulative import time of each module, in microseconds."""
+    times = {}
+    for line in _run("-X", "importtime", "-c", "import xtractmime").stderr.splitlines()[1:]:
+        _, cumulative, module = line.split("|")
+        times[module.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    _run("-c", "import xtractmime")  # Write the bytecode caches.
+    imports, first_calls, modules = [], [], {}
+    for _ in range(runs):
+        import_time, first_call = map(float, _run("-c", _FIRST_CALL).stdout.split())
+        imports.append(import_time)
+        first_calls.append(first_call)
+        for module, cumulative in _import_times().items():
+            modules.setdefault(module, []).append(cumulative)
+    print(f"import xtractmime    {statistics.median(imports) * 1e3:8.2f} ms (median of {runs})")
+    print(f"first extract_mime   {statistics.median(first_calls) * 1e3:8.2f} ms")
+    print("slowest modules, cumulative:")
+    medians = {module: statistics.median(times) for module, times in modules.items()}
+    for module, median in sorted(medians.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {module:30} {median / 1e3:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Compare :func:`xtractmime.is_binary_data` with the original per-byte loop.
+
+Run with ``python benchmarks/is_binary_data.py``.
+"""
+import timeit
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH, is_binary_data
+from xtractmime._patterns import BINARY_BYTES
+
+
+def is_binary_data_loop(input_bytes: bytes) -> bool:
+    for i in input_bytes:
+        if bytes([i]) in BINARY_BYTES:
+            return True
+
+    return False
+
+
+CASES = {
+    "text": b"a" * RESOURCE_HEADER_BUFFER_LENGTH,
+    "binary at end": b"a" * (RESOURCE_HEADER_BUFFER_LENGTH - 1) + b"\x00",
+    "binary at start": b"\x00" + b"a" * (RESOURCE_HEADER_BUFFER_LENGTH - 1),
+}
+
+
+def main():
+    for name, input_bytes in CASES.items():
+        body = memoryview(input_bytes)
+        for function in (is_binary_data_loop, is_binary_data):
+            timer = timeit.Timer(lambda: function(body))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            print(f"{name:16} {function.__name__:20} {best * 1e6:10.2f} us")
+
+
+if __name__ == "__main__":
+    main()
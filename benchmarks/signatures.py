@@ -0,0 +1,68 @@
+"""Measure how the time to sniff a resource of unknown type grows with the
+number of ``extra_types``, with a :class:`xtractmime.Sniffer`, which indexes
+them, and with :func:`xtractmime.extract_mime`, which tries them one by one.
+
+Run with ``python benchmarks/signatures.py [MAGIC_FILE]`` from the root of the
+repository. If a shared-mime-info ``magic`` file, such as
+``/usr/share/mime/magic``, is given, sniffing with its rules is measured too.
+"""
+import random
+import sys
+import timeit
+
+from xtractmime import PatternArena, Sniffer, extract_mime
+from xtractmime.signatures import load_magic
+
+REPEAT = 5
+NUMBER = 1000
+COUNTS = (0, 10, 100, 1000, 2000, 10_000)
+OFFSETS = (0, 0, 0, 0, 2, 4, 8, 257)
+
+BODIES = (
+    b"plain text that matches no signature " * 40,
+    bytes(range(1, 256)) * 6,
+    b"\x00\x01\x02\x03" + bytes(1441),
+)
+
+
+def _signatures(count: int):
+    generator = random.Random(count)
+    for index in range(count):
+        offset = generator.choice(OFFSETS)
+        size = generator.randint(4, 12)
+        pattern = bytes(generator.randrange(256) for _ in range(size))
+        mime_type = b"application/x-signature-%d" % index
+        yield bytes(offset) + pattern, bytes(offset) + b"\xff" * size, None, mime_type
+
+
+def _time(function) -> float:
+    """Return the mean of the best times of *function* on each of
+    :data:`BODIES`, in microseconds."""
+    timings = [
+        min(timeit.repeat(lambda: function(body), number=NUMBER, repeat=REPEAT)) / NUMBER
+        for body in BODIES
+    ]
+    return sum(timings) / len(timings) * 1e6
+
+
+def main():
+    print(f"{'extra_types':>12} {'Sniffer.sniff':>14} {'extract_mime':>14}")
+    for count in COUNTS:
+        extra_types = PatternArena(_signatures(count))
+        sniffer = Sniffer(extra_types=extra_types)
+        indexed = _time(sniffer.sniff)
+        patterns = tuple(extra_types)
+        linear = _time(lambda body: extract_mime(body, extra_types=patterns or None))
+        print(f"{count:12} {indexed:12.2f}us {linear:12.2f}us")
+    if len(sys.argv) > 1:
+        for max_range in (16, 257):
+            extra_types = load_magic(sys.argv[1], max_range=max_range)
+            sniffer = Sniffer(extra_types=extra_types)
+            print(
+                f"magic, max_range={max_range}: {len(extra_types)} extra_types, "
+                f"Sniffer.sniff {_time(sniffer.sniff):.2f}us"
+            )
+
+
+if __name__ == "__main__":
+    main()
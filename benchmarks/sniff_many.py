@@ -0,0 +1,28 @@
+"""Compare :meth:`xtractmime.Sniffer.sniff_many` with and without NumPy on
+batches of bodies without a supplied MIME type.
+
+Run with ``python benchmarks/sniff_many.py`` from the root of the repository,
+with NumPy installed.
+"""
+import timeit
+
+import corpus
+
+from xtractmime import Sniffer
+
+
+def main():
+    bodies = [body for _, body, options in corpus.build() if not options]
+    sniffer = Sniffer()
+    for size in (16, 64, 256, 1024, 4096):
+        batch = [bodies[index % len(bodies)] for index in range(size)]
+        for vectorized in (False, True):
+            timer = timeit.Timer(lambda: sniffer.sniff_many(batch, vectorized=vectorized))
+            number, _ = timer.autorange()
+            best = min(timer.repeat(repeat=5, number=number)) / number
+            label = "vectorized" if vectorized else "scalar"
+            print(f"{size:5} bodies {label:10} {best / size * 1e6:8.2f} us per body")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark every decision branch of :func:`xtractmime.extract_mime`.
+
+Run with ``python benchmarks/suite.py`` (or ``tox -e benchmark``) from the
+root of the repository, with xtractmime installed. For each case of the
+generated corpus, it reports the calls per second, the mean latency of a
+call, and the memory allocated during a call.
+
+Use ``--json FILE`` to save the results, and ``--compare FILE`` to compare
+them with saved results: the exit status is 1 if any case is slower than in
+the saved results by more than ``--threshold`` (a ratio, 1.25 by default).
+"""
+import argparse
+import json
+import sys
+import timeit
+import tracemalloc
+from typing import Any, Callable, Dict
+
+import corpus
+
+from xtractmime import extract_mime
+
+
+def _measure(function: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    latency = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    function()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        function()
+        after, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ops_per_second": 1 / latency,
+        "latency_us": latency * 1e6,
+        "allocated_bytes": peak - before,
+        "retained_bytes": after - before,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", "--filter", default="", help="only run cases containing FILTER")
+    parser.add_argument("--repeat", type=int, default=5, help="timing repetitions per case")
+    parser.add_argument("--json", metavar="FILE", help="save the results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="compare with results saved in FILE")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = {}
+    regressions = []
+    print(f"{'case':40} {'ops/s':>12} {'latency':>12} {'allocated':>10} {'ratio':>6}")
+    for name, body, kwargs in corpus.build():
+        if args.filter not in name:
+            continue
+        result = _measure(lambda: extract_mime(body, **kwargs), args.repeat)
+        results[name] = result
+
+        ratio = ""
+        if name in baseline:
+            slowdown = result["latency_us"] / baseline[name]["latency_us"]
+            ratio = f"{slowdown:.2f}"
+            if slowdown > args.threshold:
+                regressions.append(name)
+        print(
+            f"{name:40} {result['ops_per_second']:12.0f} "
+            f"{result['latency_us']:10.2f}us {result['allocated_bytes']:9d}B {ratio:>6}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than {args.compare}:", file=sys.stderr)
+        for name in regressions:
+            print(f"  {name}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Measure how sniffing scales with the number of threads, with threads that
+share a :class:`xtractmime.Sniffer`, as download workers do, and with
+:func:`xtractmime.extract_mime_many` and a thread pool.
+
+Run with ``python benchmarks/threads.py [MAX_THREADS]`` from the root of the
+repository. Sniffing only scales on free-threaded builds of CPython.
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import corpus
+
+from xtractmime import Sniffer, extract_mime_many
+
+REPEAT = 3
+BODIES = 20_000
+
+
+def _best(function) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _workers(sniffer, calls, threads):
+    def work(start):
+        for body, content_types in calls[start::threads]:
+            sniffer.sniff(body, content_types=content_types)
+
+    workers = [threading.Thread(target=work, args=(start,)) for start in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def _pool(bodies, content_types_list, threads):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        extract_mime_many(bodies, content_types_list, executor=executor)
+
+
+def main():
+    max_threads = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"GIL {'enabled' if gil_enabled else 'disabled'}, {BODIES} bodies")
+    cases = [
+        (body, options.get("content_types"))
+        for _, body, options in corpus.build()
+        if set(options) <= {"content_types"}
+    ]
+    calls = [cases[index % len(cases)] for index in range(BODIES)]
+    bodies = [body for body, _ in calls]
+    content_types_list = [content_types for _, content_types in calls]
+    sniffer = Sniffer()
+    baselines = {}
+    threads = 1
+    while threads <= max_threads:
+        for name, function in (
+            ("workers", lambda: _workers(sniffer, calls, threads)),
+            ("extract_mime_many", lambda: _pool(bodies, content_types_list, threads)),
+        ):
+            best = _best(function)
+            baselines.setdefault(name, best)
+            print(
+                f"{threads:3} threads {name:18} {BODIES / best:10.0f} bodies/s "
+                f"{baselines[name] / best:5.2f}x"
+            )
+        threads *= 2
+
+
+if __name__ == "__main__":
+    main()
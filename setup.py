@@ -18,6 +18,7 @@ setuptools.setup(
     url="https://github.com/scrapy/xtractmime",
     packages=["xtractmime"],
     python_requires=">=3.7",
+    extras_require={"numpy": ["numpy"]},
     classifiers=[
         "Development Status :: 1 - Planning",
         "License :: OSI Approved :: BSD License",
@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+
+from xtractmime.__main__ import main
+from xtractmime._batch import map_chunks
+
+EXPECTED = {
+    "tests/files/foo.gif": "image/gif",
+    "tests/files/foo.html": "text/html",
+    "tests/files/foo.pdf": "application/pdf",
+    "tests/files/foo.zip": "application/zip",
+}
+
+
+class TestCli:
+    def run(self, capsys, *argv):
+        status = main(argv)
+        return status, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            ("-j", "1"),
+            ("-j", "2", "--executor", "thread", "--chunk-size", "1"),
+            ("-j", "2", "--executor", "process"),
+        ],
+    )
+    def test_paths(self, capsys, options):
+        status, records = self.run(capsys, *options, *EXPECTED)
+        assert status == 0
+        assert records == [{"path": path, "result": result} for path, result in EXPECTED.items()]
+
+    def test_directory(self, capsys):
+        status, records = self.run(capsys, "-j", "1", "tests/files")
+        assert status == 0
+        paths = [record["path"] for record in records]
+        assert paths == sorted(paths)
+        assert {"path": "tests/files/foo.gif", "result": "image/gif"} in records
+
+    def test_stdin(self, capsys, monkeypatch):
+        monkeypatch.setattr(
+            "sys.stdin",
+            io.StringIO("tests/files/foo.gif\ttext/html\n\ntests/files/foo.exe\n"),
+        )
+        status, records = self.run(capsys, "-j", "1", "-t", "text/plain")
+        assert status == 0
+        assert records == [
+            {"path": "tests/files/foo.gif", "supplied_type": "text/html", "result": "text/html"},
+            {
+                "path": "tests/files/foo.exe",
+                "supplied_type": "text/plain",
+                "result": "application/octet-stream",
+            },
+        ]
+
+    def test_options(self, capsys):
+        status, records = self.run(
+            capsys, "-j", "1", "-t", "text/plain", "--no-http-origin", "tests/files/foo.exe"
+        )
+        assert records[0]["result"] == "text/plain"
+        status, records = self.run(
+            capsys, "-j", "1", "-t", "image/png", "--no-sniff", "tests/files/foo.gif"
+        )
+        assert records[0]["result"] == "image/png"
+
+    def test_missing_file(self, capsys):
+        status, records = self.run(capsys, "-j", "1", "tests/files/missing", "tests/files/foo.gif")
+        assert status == 1
+        assert records[0]["path"] == "tests/files/missing"
+        assert "error" in records[0]
+        assert records[1] == {"path": "tests/files/foo.gif", "result": "image/gif"}
+
+    def test_invalid_jobs(self, capsys):
+        with pytest.raises(SystemExit):
+            main(["-j", "0"])
+
+    def test_map_chunks(self):
+        class Done:
+            def __init__(self, result):
+                self._result = result
+
+            def result(self):
+                return self._result
+
+        submitted = []
+
+        def submit(chunk):
+            submitted.append(list(chunk))
+            return Done([{"path": path} for path, _ in chunk])
+
+        tasks = [(str(number), None) for number in range(7)]
+        records = list(map_chunks(submit, tasks, 3, 2))
+        assert [record["path"] for record in records] == [str(number) for number in range(7)]
+        assert [len(chunk) for chunk in submitted] == [3, 3, 1]
@@ -1,12 +1,44 @@
+import array
+import asyncio
+import bz2
+import gzip
+import io
+import lzma
+import mmap
+import multiprocessing
+import os
+import pathlib
+import sys
+import tracemalloc
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import pytest
 
+import xtractmime
 from xtractmime import (
+    RESOURCE_HEADER_BUFFER_LENGTH,
+    VECTORIZED_MIN_BATCH_SIZE,
+    CacheInfo,
+    IncrementalSniffer,
+    Sniffer,
+    Classification,
+    MimeCandidate,
+    PatternArena,
+    Trace,
     _find_unknown_mimetype,
+    _parse_content_types,
     _sniff_mislabled_binary,
     _sniff_mislabled_feed,
+    classify_mime,
     extract_mime,
+    extract_mime_async,
+    extract_mime_from_file,
+    extract_mime_from_path,
+    extract_mime_many,
     is_binary_data,
 )
+from xtractmime._batch import default_chunk_size
 
 
 class TestMain:
@@ -73,6 +105,8 @@ class TestMain:
             (b"", (b"text/html; charset=utf-8",), True, False, None, None, b"text/html"),
             (b"", (b"text/htmlpdfthing",), True, False, None, None, b"text/htmlpdfthing"),
             (b"", None, True, False, None, None, b"text/plain"),
+            (b"     ", None, True, False, None, None, b"text/plain"),
+            (b"    <H", None, True, False, None, None, b"text/plain"),
             (
                 b"test",
                 None,
@@ -157,6 +191,701 @@ class TestMain:
             == expected
         )
 
+    @pytest.mark.parametrize(
+        "body,content_types,no_sniff,expected",
+        [
+            ("foo.pdf", None, False, b"application/pdf"),
+            ("foo.gif", (b"image/png",), False, b"image/gif"),
+            ("foo.gif", (b"image/png",), True, b"image/png"),
+            ("foo.exe", (b"text/plain",), False, b"application/octet-stream"),
+            (b"test", None, False, b"text/test"),
+            (b"<html>", None, True, b"text/plain"),
+        ],
+    )
+    def test_sniffer(self, body, content_types, no_sniff, expected):
+        if isinstance(body, str):
+            with open(f"tests/files/{body}", "rb") as input_file:
+                body = input_file.read()
+        sniffer = Sniffer(extra_types=self.extra_types, supported_types={b"image/gif"})
+        assert sniffer.sniff(body, content_types=content_types, no_sniff=no_sniff) == expected
+
+    def test_extract_mime_extra_types_list(self):
+        extra_types = [(b"te\x00t", b"\xff\xff\x00\xff", None, b"text/test")]
+        assert extract_mime(b"text", extra_types=extra_types) == b"text/test"
+        extra_types.append((b"abc", b"\xff\xff", None, b"text/test"))
+        with pytest.raises(ValueError):
+            extract_mime(b"abc", extra_types=extra_types)
+
+    def test_sniffer_pattern_arena(self):
+        extra_types = self.extra_types + (
+            (b"<?X\x00", b"\xff\xff\xdf\x00", {b" "}, b"text/x"),
+            (b"\x00\x00", b"\x00\x00", None, b"application/x-any"),
+        )
+        bodies = [b"test", b" <?Xm", b"<?xml", b"ab", b"a", b""]
+        bodies += [path.read_bytes() for path in sorted(pathlib.Path("tests/files").iterdir())]
+        arena = PatternArena(iter(extra_types))
+        sniffer = Sniffer(extra_types=arena)
+        expected = [Sniffer(extra_types=extra_types).sniff(body) for body in bodies]
+        assert [sniffer.sniff(body) for body in bodies] == expected
+        assert sniffer.classify(b" <?Xm").candidates == (
+            MimeCandidate("extra_types", b"text/x"),
+            MimeCandidate("extra_types", b"application/x-any"),
+        )
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            assert (
+                extract_mime_many(bodies, extra_types=arena, executor=executor, chunk_size=4)
+                == expected
+            )
+
+    def test_sniffer_invalid_extra_types(self):
+        with pytest.raises(ValueError):
+            Sniffer(extra_types=((b"test", b"\xff", None, b"text/test"),))
+
+    @pytest.mark.parametrize("vectorized", [None, False])
+    def test_sniff_many(self, vectorized):
+        bodies = [
+            pathlib.Path(f"tests/files/{name}").read_bytes() for name in ("foo.pdf", "foo.gif")
+        ]
+        bodies += [b"test", b"<html>"]
+        content_types_list = [None, (b"image/png",), None, (b"text/plain",)]
+        sniffer = Sniffer(extra_types=self.extra_types, supported_types={b"image/gif"})
+        assert sniffer.sniff_many(
+            bodies, content_types_list=content_types_list, vectorized=vectorized
+        ) == [b"application/pdf", b"image/gif", b"text/test", b"text/plain"]
+        assert sniffer.sniff_many(bodies, no_sniff=True, vectorized=vectorized) == [
+            b"text/plain",
+            b"image/gif",
+            b"text/test",
+            b"text/plain",
+        ]
+        assert sniffer.sniff_many([], vectorized=vectorized) == []
+
+    def test_sniff_many_invalid_content_types_list(self):
+        with pytest.raises(ValueError):
+            Sniffer().sniff_many([b"test"], content_types_list=[])
+
+    def test_sniff_many_vectorized_unmasked_pattern_bits(self):
+        pytest.importorskip("numpy")
+        # Lower-case letters have a bit that the 0xDF mask clears.
+        extra_types = (
+            (b"<rss", b"\xff\xdf\xdf\xdf", {b" ", b"\n"}, b"x/rss"),
+            (b"<FEED", b"\xff\xdf\xdf\xdf\xdf", {b" ", b"\n"}, b"x/feed"),
+        )
+        bodies = [b"<rssp>", b" <RSS>", b"\n<rSs", b"<feed>"]
+        sniffer = Sniffer(extra_types=extra_types)
+        assert sniffer.sniff_many(bodies, vectorized=True) == [
+            sniffer.sniff(body) for body in bodies
+        ]
+
+    def test_sniff_many_without_numpy(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "numpy", None)
+        monkeypatch.delitem(sys.modules, "xtractmime._vectorized", raising=False)
+        monkeypatch.delattr(xtractmime, "_vectorized", raising=False)
+        bodies = [b"GIF89a"] * VECTORIZED_MIN_BATCH_SIZE
+        assert Sniffer().sniff_many(bodies) == [b"image/gif"] * len(bodies)
+        with pytest.raises(ImportError):
+            Sniffer().sniff_many(bodies, vectorized=True)
+
+    @pytest.mark.parametrize("extra_types", [None, extra_types])
+    @pytest.mark.parametrize("no_sniff", [False, True])
+    def test_sniff_many_vectorized(self, extra_types, no_sniff):
+        pytest.importorskip("numpy")
+        bodies = [b"", b" ", b"\x00", b" \t\n<html>", b" " * 2000 + b"<html>", b"text"]
+        for path in sorted(pathlib.Path("tests/files").iterdir()):
+            body = path.read_bytes()
+            bodies += [body, body[:4], body[:12], body[:RESOURCE_HEADER_BUFFER_LENGTH]]
+        content_types_list = [
+            (None, (b"application/unknown",), (b"text/plain",))[position % 3]
+            for position in range(len(bodies))
+        ]
+        sniffer = Sniffer(extra_types=extra_types)
+        assert sniffer.sniff_many(
+            bodies, content_types_list=content_types_list, no_sniff=no_sniff, vectorized=True
+        ) == [
+            sniffer.sniff(body, content_types=content_types, no_sniff=no_sniff)
+            for body, content_types in zip(bodies, content_types_list)
+        ]
+
+    @pytest.mark.parametrize(
+        "executor_class,chunk_size",
+        [(None, 1024), (ThreadPoolExecutor, 3), (ProcessPoolExecutor, 3)],
+    )
+    def test_extract_mime_many(self, executor_class, chunk_size):
+        bodies = [b"test", b"", bytearray(b"GIF89a"), memoryview(b"\x00<html>")[1:]]
+        bodies += [path.read_bytes() for path in sorted(pathlib.Path("tests/files").iterdir())]
+        content_types_list = [
+            (None, (b"text/plain",), (b"image/png",))[position % 3]
+            for position in range(len(bodies))
+        ]
+        expected = [
+            extract_mime(
+                body,
+                content_types=content_types,
+                extra_types=self.extra_types,
+                supported_types={b"image/gif"},
+            )
+            for body, content_types in zip(bodies, content_types_list)
+        ]
+        options = dict(extra_types=self.extra_types, supported_types={b"image/gif"})
+        if executor_class is None:
+            results = extract_mime_many(bodies, content_types_list, **options)
+        else:
+            with executor_class(max_workers=2) as executor:
+                results = extract_mime_many(
+                    bodies, content_types_list, executor=executor, chunk_size=chunk_size, **options
+                )
+        assert results == expected
+        assert results[0] == b"text/test"
+
+    @pytest.mark.parametrize(
+        "count,max_workers,expected",
+        [(0, 4, 64), (1000, 4, 64), (10_000, 4, 625), (1_000_000, 4, 1024)],
+    )
+    def test_extract_mime_many_default_chunk_size(self, count, max_workers, expected):
+        assert default_chunk_size(count, max_workers) == expected
+
+    @pytest.mark.parametrize("start_method", multiprocessing.get_all_start_methods())
+    def test_extract_mime_many_start_methods(self, start_method):
+        bodies = [b"test", b"GIF89a", b"<html>"] * 3
+        context = multiprocessing.get_context(start_method)
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as executor:
+            results = extract_mime_many(
+                bodies, extra_types=self.extra_types, executor=executor, max_workers=2
+            )
+        assert results == [b"text/test", b"image/gif", b"text/html"] * 3
+
+    def test_threads(self):
+        extra_types = ((b"test", b"\xff\xff\xff\xff", None, b"text/test"),)
+        sniffer = Sniffer(extra_types=extra_types, cache_size=16)
+        calls = []
+        for name in sorted(os.listdir("tests/files")):
+            body = pathlib.Path(f"tests/files/{name}").read_bytes()
+            for content_types in (None, (b"text/plain",), (b"text/html",), (b"image/png",)):
+                calls.append((body, content_types))
+        calls.append((b"test", None))
+
+        def sniff(call):
+            body, content_types = call
+            return (
+                sniffer.sniff(body, content_types=content_types),
+                extract_mime(body, content_types=content_types, extra_types=extra_types),
+                sniffer.classify(body, content_types=content_types),
+            )
+
+        expected = [sniff(call) for call in calls]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(5):
+                assert list(executor.map(sniff, calls * 10)) == expected * 10
+
+    def test_extract_mime_many_without_shared_memory(self, monkeypatch):
+        monkeypatch.setattr("xtractmime._batch.shared_memory", None)
+        bodies = [b"test", b"GIF89a", b"<html>"] * 3
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = extract_mime_many(
+                bodies, extra_types=self.extra_types, executor=executor, chunk_size=2
+            )
+        assert results == [b"text/test", b"image/gif", b"text/html"] * 3
+
+    def test_extract_mime_many_invalid(self):
+        with pytest.raises(ValueError):
+            extract_mime_many([b"test"], [])
+        with pytest.raises(ValueError):
+            extract_mime_many([b"test"], chunk_size=0)
+        with pytest.raises(ValueError):
+            extract_mime_many([b"test"], max_workers=0)
+
+    @pytest.mark.parametrize(
+        "body,content_types,no_sniff,expected,rule,stages",
+        [
+            (
+                "foo.gif",
+                None,
+                False,
+                b"image/gif",
+                "IMAGE_PATTERNS[3] b'GIF87a'",
+                (
+                    "content types",
+                    "text patterns",
+                    "extra patterns",
+                    "extra_types",
+                    "image patterns",
+                ),
+            ),
+            (
+                b" <html>",
+                None,
+                False,
+                b"text/html",
+                "TEXT_PATTERNS[3] b'<HTML>'",
+                ("content types", "text patterns"),
+            ),
+            (
+                b"test",
+                None,
+                False,
+                b"text/test",
+                "extra_types[0] b'test'",
+                ("content types", "text patterns", "extra patterns", "extra_types"),
+            ),
+            (
+                "NonID3.mp3",
+                None,
+                False,
+                b"audio/mpeg",
+                "is_mp3_non_ID3_signature",
+                (
+                    "content types",
+                    "text patterns",
+                    "extra patterns",
+                    "extra_types",
+                    "image patterns",
+                    "audio/video signatures",
+                ),
+            ),
+            (
+                b"ab\x00",
+                None,
+                False,
+                b"application/octet-stream",
+                "binary check: binary data byte at offset 2",
+                (
+                    "content types",
+                    "text patterns",
+                    "extra patterns",
+                    "extra_types",
+                    "image patterns",
+                    "audio/video signatures",
+                    "archive patterns",
+                    "binary check",
+                ),
+            ),
+            (
+                "foo.exe",
+                (b"text/plain",),
+                False,
+                b"application/octet-stream",
+                "apache binary check: binary data byte at offset 3",
+                ("content types", "apache binary check"),
+            ),
+            (
+                b"\xef\xbb\xbf\x00",
+                (b"text/plain",),
+                False,
+                b"text/plain",
+                "apache binary check: BOM",
+                ("content types", "apache binary check"),
+            ),
+            (
+                b"<!-- a --><rss>",
+                (b"text/html",),
+                False,
+                b"application/rss+xml",
+                "feed: rss",
+                ("content types", "feed check"),
+            ),
+            (
+                b"<rdf:RDF http://purl.org/rss/1.0/ http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+                (b"text/html",),
+                False,
+                b"application/rss+xml",
+                "feed: rdf:RDF",
+                ("content types", "feed check"),
+            ),
+            (
+                b"<html>",
+                (b"text/html",),
+                False,
+                b"text/html",
+                "feed: not a feed",
+                ("content types", "feed check"),
+            ),
+            (
+                b"<a/>",
+                (b"text/xml",),
+                False,
+                b"text/xml",
+                "supplied XML MIME type",
+                ("content types",),
+            ),
+            (
+                "foo.gif",
+                (b"image/png",),
+                False,
+                b"image/gif",
+                "IMAGE_PATTERNS[3] b'GIF87a'",
+                ("content types", "image patterns"),
+            ),
+            (
+                "foo.pdf",
+                (b"image/png",),
+                False,
+                b"image/png",
+                "supplied MIME type",
+                ("content types", "image patterns"),
+            ),
+            (
+                "foo.gif",
+                (b"image/png",),
+                True,
+                b"image/png",
+                "no_sniff: supplied MIME type",
+                ("content types",),
+            ),
+        ],
+    )
+    def test_sniffer_trace(self, body, content_types, no_sniff, expected, rule, stages):
+        if isinstance(body, str):
+            with open(f"tests/files/{body}", "rb") as input_file:
+                body = input_file.read()
+        sniffer = Sniffer(extra_types=self.extra_types, supported_types={b"image/gif"})
+        trace = Trace()
+        assert (
+            sniffer.sniff(body, content_types=content_types, no_sniff=no_sniff, trace=trace)
+            == expected
+        )
+        assert trace.rule == rule
+        assert tuple(stage for stage, _ in trace.stages) == stages
+        assert all(duration >= 0 for _, duration in trace.stages)
+
+    def test_extract_mime_trace(self):
+        trace = Trace()
+        assert extract_mime(b"%PDF-", trace=trace) == b"application/pdf"
+        assert trace.rule == "TEXT_PATTERNS[35] b'%PDF-'"
+        assert extract_mime(b"", trace=trace) == b"text/plain"
+        assert trace.rule == "binary check: no binary data bytes"
+        assert len(trace.stages) == 7
+
+    @pytest.mark.parametrize(
+        "content_encoding,compress",
+        [
+            (b"gzip", gzip.compress),
+            (b"X-GZIP", gzip.compress),
+            (b"deflate", zlib.compress),
+            (b"deflate", lambda data: zlib.compress(data)[2:-4]),
+            (b"bzip2", bz2.compress),
+            (b"xz", lzma.compress),
+            (b"lzma", lambda data: lzma.compress(data, format=lzma.FORMAT_ALONE)),
+            (b"identity", lambda data: data),
+            (b"identity, gzip", gzip.compress),
+        ],
+    )
+    @pytest.mark.parametrize(
+        "file_name,expected",
+        [
+            ("foo.gif", b"image/gif"),
+            ("foo.html", b"text/html"),
+            ("foo.txt", b"text/plain"),
+            ("foo.zip", b"application/zip"),
+        ],
+    )
+    def test_extract_mime_content_encoding(self, content_encoding, compress, file_name, expected):
+        with open(f"tests/files/{file_name}", "rb") as input_file:
+            body = compress(input_file.read())
+        assert extract_mime(body, content_encoding=content_encoding) == expected
+        sniffer = Sniffer()
+        assert sniffer.sniff(body[: len(body) // 2 + 1], content_encoding=content_encoding) in (
+            expected,
+            b"text/plain",
+        )
+
+    def test_sniffer_cache(self):
+        sniffer = Sniffer(cache_size=2)
+        assert sniffer.cache_info() == CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+        assert sniffer.sniff(b"GIF89a") == b"image/gif"
+        assert sniffer.sniff(bytearray(b"GIF89a")) == b"image/gif"
+        assert sniffer.sniff(b"GIF89a", content_types=(b"text/plain",)) == b"text/plain"
+        assert sniffer.sniff(b"GIF89a", no_sniff=True) == b"image/gif"
+        assert sniffer.cache_info() == CacheInfo(hits=1, misses=3, maxsize=2, currsize=2)
+        assert sniffer.cache_info().hit_rate == 0.25
+        # The least recently used result was evicted.
+        assert sniffer.sniff(b"GIF89a") == b"image/gif"
+        assert sniffer.cache_info().misses == 4
+        # Results that do not depend on the body are not cached.
+        assert sniffer.sniff(b"GIF89a", content_types=(b"text/xml",)) == b"text/xml"
+        assert sniffer.sniff(b"GIF89a", content_types=(b"image/png",)) == b"image/png"
+        assert sniffer.cache_info().misses == 4
+        # Only the resource header is digested.
+        body = b"<rss" + b" " * RESOURCE_HEADER_BUFFER_LENGTH
+        assert sniffer.sniff(body, content_types=(b"text/html",)) == b"application/rss+xml"
+        assert sniffer.sniff(body + b"\x00", content_types=(b"text/html",)) == (
+            b"application/rss+xml"
+        )
+        assert sniffer.cache_info().hits == 2
+
+        sniffer.cache_clear()
+        assert sniffer.cache_info() == CacheInfo(hits=0, misses=0, maxsize=2, currsize=0)
+        assert sniffer.cache_info().hit_rate == 0.0
+        assert Sniffer().cache_info() == CacheInfo(hits=0, misses=0, maxsize=0, currsize=0)
+        with pytest.raises(ValueError):
+            Sniffer(cache_size=-1)
+
+    def test_sniffer_cache_trace(self):
+        sniffer = Sniffer(cache_size=2)
+        sniffer.sniff(b"%PDF-")
+        trace = Trace()
+        assert sniffer.sniff(b"%PDF-", trace=trace) == b"application/pdf"
+        assert trace.rule == "TEXT_PATTERNS[35] b'%PDF-'"
+        assert sniffer.cache_info().hits == 0
+
+    def test_sniffer_cache_threads(self):
+        sniffer = Sniffer(cache_size=8)
+        bodies = [b"GIF89a", b"<html>", b"%PDF-", b"\x00\x01", b"text", b"PK\x03\x04"] * 500
+        expected = [extract_mime(body) for body in bodies]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(sniffer.sniff, bodies))
+        assert results == expected
+        info = sniffer.cache_info()
+        assert info.hits + info.misses == len(bodies)
+        assert info.currsize == 6
+
+    def test_extract_mime_content_encoding_bounded(self):
+        body = gzip.compress(b"<html>" + os.urandom(100_000))
+        # Decompressing past the first input chunk would fail.
+        body = body[:4096] + b"\xff" * (len(body) - 4096)
+        assert extract_mime(body, content_encoding=b"gzip") == b"text/html"
+        with pytest.raises(ValueError):
+            extract_mime(b"\xff" + body[1:], content_encoding=b"gzip")
+
+    def test_extract_mime_content_encoding_trace(self):
+        trace = Trace()
+        body = gzip.compress(b"%PDF-")
+        assert extract_mime(body, content_encoding=b"gzip", trace=trace) == b"application/pdf"
+        assert trace.stages[1][0] == "content decoding"
+        assert (
+            extract_mime(
+                body, content_types=(b"text/plain",), no_sniff=True, content_encoding=b"br"
+            )
+            == b"text/plain"
+        )
+
+    @pytest.mark.parametrize(
+        "body,content_encoding",
+        [
+            (b"GIF89a", b"gzip"),
+            (b"GIF89a", b"bzip2"),
+            (b"GIF89a", b"xz"),
+            (zlib.compress(b"GIF89a")[:2] + b"\xff" * 10, b"deflate"),
+            (gzip.compress(b"GIF89a"), b"br"),
+            (gzip.compress(gzip.compress(b"GIF89a")), b"gzip, gzip"),
+        ],
+    )
+    def test_extract_mime_content_encoding_invalid(self, body, content_encoding):
+        with pytest.raises(ValueError):
+            extract_mime(body, content_encoding=content_encoding)
+
+    @pytest.mark.parametrize(
+        "body,content_types,expected,decided_after",
+        [
+            ("foo.gif", None, b"image/gif", 6),
+            ("foo.mp4", None, b"video/mp4", 32),
+            ("foo.zip", None, b"application/zip", 8),
+            ("foo.html", None, b"text/html", 15),
+            ("foo.txt", None, b"text/plain", 1445),
+            ("foo.exe", (b"text/plain",), b"application/octet-stream", 4),
+            ("foo.html", (b"text/html",), b"text/html", 19),
+            (sample_xml1, (b"text/html",), b"application/rss+xml", 122),
+            (b"", (b"image/gif",), b"image/gif", 0),
+        ],
+    )
+    def test_incremental_sniffer(self, body, content_types, expected, decided_after):
+        if isinstance(body, str):
+            with open(f"tests/files/{body}", "rb") as input_file:
+                body = input_file.read()
+        sniffer = IncrementalSniffer(content_types=content_types)
+        for index in range(decided_after):
+            assert not sniffer.done
+            assert sniffer.feed(body[index : index + 1]) is sniffer.result
+        assert sniffer.done
+        assert sniffer.result == expected
+        assert sniffer.feed(body[decided_after:]) == expected
+        assert sniffer.close() == expected
+
+    @pytest.mark.parametrize(
+        "body,content_types,expected",
+        [
+            (b"", None, b"text/plain"),
+            (b"<html", None, b"text/plain"),
+            (b"GIF87", None, b"text/plain"),
+            (b"\xef\xbb", (b"text/plain",), b"text/plain"),
+            (b"<rs", (b"text/html",), b"text/html"),
+        ],
+    )
+    def test_incremental_sniffer_close(self, body, content_types, expected):
+        sniffer = IncrementalSniffer(content_types=content_types)
+        assert sniffer.feed(body) is None
+        assert sniffer.close() == expected
+        assert sniffer.done
+
+    def test_incremental_sniffer_options(self):
+        sniffer = IncrementalSniffer(sniffer=Sniffer(extra_types=self.extra_types))
+        assert sniffer.feed(b"tes") is None
+        assert sniffer.feed(b"t") == b"text/test"
+
+    @pytest.mark.parametrize(
+        "body,content_types,expected",
+        [
+            ("foo.gif", None, b"image/gif"),
+            ("foo.txt", None, b"text/plain"),
+            ("foo.html", (b"text/html",), b"text/html"),
+            (b"", None, b"text/plain"),
+            (b"", (b"image/gif",), b"image/gif"),
+        ],
+    )
+    def test_extract_mime_async(self, body, content_types, expected):
+        if isinstance(body, str):
+            with open(f"tests/files/{body}", "rb") as input_file:
+                body = input_file.read()
+
+        async def chunks():
+            for index in range(0, len(body), 1000):
+                yield body[index : index + 1000]
+
+        async def sniff_chunks():
+            iterator = chunks()
+            result, data = await extract_mime_async(iterator, content_types=content_types)
+            return result, data + b"".join([chunk async for chunk in iterator])
+
+        async def sniff_stream_reader():
+            reader = asyncio.StreamReader()
+            reader.feed_data(body)
+            reader.feed_eof()
+            result, data = await extract_mime_async(reader, content_types=content_types)
+            assert len(data) <= 1445
+            return result, data + await reader.read()
+
+        assert asyncio.run(sniff_chunks()) == (expected, body)
+        assert asyncio.run(sniff_stream_reader()) == (expected, body)
+
+    def test_sniff_async_stops_reading_once_decided(self):
+        async def sniff():
+            reader = asyncio.StreamReader()
+            reader.feed_data(b"GIF89a")
+            sniffer = Sniffer(supported_types={b"image/gif"})
+            return await asyncio.wait_for(
+                sniffer.sniff_async(reader, content_types=(b"image/png",)), timeout=5
+            )
+
+        assert asyncio.run(sniff()) == (b"image/gif", b"GIF89a")
+
+    def test_sniff_async_invalid_stream(self):
+        with open("tests/files/foo.txt", "rb") as input_file:
+            with pytest.raises(TypeError):
+                asyncio.run(extract_mime_async(input_file))
+
+    @pytest.mark.parametrize(
+        "file_name,content_types,expected",
+        [
+            ("foo.gif", None, b"image/gif"),
+            ("foo.html", None, b"text/html"),
+            ("foo.txt", None, b"text/plain"),
+            ("foo.exe", (b"text/plain",), b"application/octet-stream"),
+            ("foo.mp4", None, b"video/mp4"),
+        ],
+    )
+    def test_extract_mime_from_path(self, file_name, content_types, expected):
+        path = f"tests/files/{file_name}"
+        assert extract_mime_from_path(path, content_types=content_types) == expected
+        assert extract_mime_from_path(pathlib.Path(path), content_types=content_types) == expected
+        with open(path, "rb") as input_file:
+            assert extract_mime_from_file(input_file, content_types=content_types) == expected
+            assert input_file.tell() <= RESOURCE_HEADER_BUFFER_LENGTH
+
+    @pytest.mark.parametrize(
+        "file_name,content_types,no_sniff",
+        [
+            (file_name, content_types, no_sniff)
+            for file_name in sorted(os.listdir("tests/files"))
+            for content_types in (None, (b"text/plain",), (b"image/png",), (b"text/html",))
+            for no_sniff in (False, True)
+        ],
+    )
+    def test_classify_mime(self, file_name, content_types, no_sniff):
+        with open(f"tests/files/{file_name}", "rb") as input_file:
+            body = input_file.read()
+        classification = classify_mime(body, content_types=content_types, no_sniff=no_sniff)
+        assert classification.mime_type == extract_mime(
+            body, content_types=content_types, no_sniff=no_sniff
+        )
+        sniffer = Sniffer(extra_types=self.extra_types)
+        assert sniffer.classify(body, content_types=content_types, no_sniff=no_sniff) == (
+            classify_mime(
+                body,
+                content_types=content_types,
+                no_sniff=no_sniff,
+                extra_types=self.extra_types,
+            )
+        )
+
+    @pytest.mark.parametrize(
+        "body,no_sniff,expected,candidates",
+        [
+            (b"", False, b"text/plain", ()),
+            (
+                pathlib.Path("tests/files/foo.ttf").read_bytes(),
+                False,
+                b"application/octet-stream",
+                (MimeCandidate("font", b"font/ttf"),),
+            ),
+            (
+                b"\x00\x00\x01\x00ftypmp42" + bytes(244),
+                False,
+                b"image/x-icon",
+                (
+                    MimeCandidate("image", b"image/x-icon"),
+                    MimeCandidate("audio/video", b"video/mp4"),
+                ),
+            ),
+            (
+                b"test<html>",
+                False,
+                b"text/test",
+                (MimeCandidate("extra_types", b"text/test"),),
+            ),
+            (
+                b"%PDF-1.4",
+                False,
+                b"application/pdf",
+                (MimeCandidate("text", b"application/pdf"),),
+            ),
+            (
+                b"%PDF-1.4",
+                True,
+                b"text/plain",
+                (MimeCandidate("text", b"application/pdf"),),
+            ),
+        ],
+    )
+    def test_classify(self, body, no_sniff, expected, candidates):
+        sniffer = Sniffer(extra_types=self.extra_types)
+        classification = sniffer.classify(body, no_sniff=no_sniff)
+        assert classification == Classification(expected, candidates)
+        assert classification.groups == {candidate.group for candidate in candidates}
+
+    def test_extract_mime_from_file_short_reads(self):
+        class ShortReader:
+            def __init__(self, body):
+                self.body = body
+                self.position = 0
+
+            def read(self, size):
+                chunk = self.body[self.position : self.position + min(size, 3)]
+                self.position += len(chunk)
+                return chunk
+
+        body = b"  " + b"a" * 2000 + b"\x00"
+        reader = ShortReader(body)
+        assert extract_mime_from_file(reader) == b"text/plain"
+        assert reader.position == RESOURCE_HEADER_BUFFER_LENGTH
+        assert extract_mime_from_file(io.BytesIO(body[-3:])) == b"application/octet-stream"
+
+    def test_extract_mime_from_file_no_sniff(self):
+        input_file = io.BytesIO(b"GIF89a")
+        assert (
+            extract_mime_from_file(input_file, content_types=(b"image/png",), no_sniff=True)
+            == b"image/png"
+        )
+        assert input_file.tell() == 0
+
     @pytest.mark.parametrize(
         "input_bytes,expected",
         [
@@ -208,6 +937,22 @@ class TestMain:
             (b"<rdf:RDF xmlns:rdf='http://www.w3.org/1999/02/22-rdf-syntax-ns#'", None, None),
             (b"<rdf:RDF xmlns:content='http://purl.org/rss/1.0/modules/content/'", None, None),
             (b"", None, None),
+            (b"\xef\xbb\xbf <!-- <feed> --> <rss>", b"text/html", b"application/rss+xml"),
+            (b"<!--> <rss> -->\n<feed>", b"text/html", b"application/atom+xml"),
+            (b"<!--> <rss>", b"text/html", b"text/html"),
+            (b"<??> <! x > <rss", b"text/html", b"application/rss+xml"),
+            (b"<? ?> x <rss", b"text/html", b"text/html"),
+            (b"<html><rss>", b"text/html", b"text/html"),
+            (
+                b"<rdf:RDF http://purl.org/rss/1.0/http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+                b"text/html",
+                b"application/rss+xml",
+            ),
+            (
+                b"<rdf:RDF http://www.w3.org/1999/02/22-rdf-syntax-ns# http://purl.org/rss/1.0",
+                b"text/html",
+                b"text/html",
+            ),
         ],
     )
     def test_sniff_mislabled_feed(self, input_bytes, supplied_type, expected):
@@ -216,6 +961,131 @@ class TestMain:
                 input_bytes = input_file.read()
         assert _sniff_mislabled_feed(input_bytes, supplied_type) == expected
 
+    @pytest.mark.parametrize(
+        "content_types,essence,flags",
+        [
+            (None, b"", {"is_unknown"}),
+            ((b"text/html", b"*/*"), b"*/*", {"is_unknown"}),
+            ((b"text/plain; charset=UTF-8",), b"text/plain", {"is_apache_type"}),
+            ((b"text/plain; charset=utf-8",), b"text/plain", set()),
+            ((b" Text/HTML ; charset=utf-8",), b"text/html", {"is_html"}),
+            ((b"application/atom+xml",), b"application/atom+xml", {"is_xml"}),
+            ((b"image/gif",), b"image/gif", {"is_image"}),
+            ((b"application/ogg",), b"application/ogg", {"is_audio_video"}),
+            ((b"a/[",), b"", {"is_unknown"}),
+        ],
+    )
+    def test_parse_content_types(self, content_types, essence, flags):
+        supplied_type = _parse_content_types(content_types)
+        assert supplied_type is _parse_content_types(content_types)
+        assert supplied_type.essence == essence
+        assert {name for name, value in supplied_type._asdict().items() if value is True} == flags
+
     def test_is_binary_data(self):
         assert is_binary_data(b"\x00\x01")
         assert not is_binary_data(b"\x09\x0a")
+
+    @pytest.mark.parametrize(
+        "body,content_types,expected",
+        [
+            (b"<html>", None, b"text/html"),
+            (b"GIF89a", None, b"image/gif"),
+            (b"\x1a\x45\xdf\xa3\x42\x82\x84webm", None, b"video/webm"),
+            (b"\x00\x00\x00\x14ftypmp42\x00\x00\x00\x00mp42isom", None, b"video/mp4"),
+            ("NonID3.mp3", None, b"audio/mpeg"),
+            (b"plain text", None, b"text/plain"),
+            (b"plain text", (b"text/plain",), b"text/plain"),
+            (b"\x00binary", (b"text/plain",), b"application/octet-stream"),
+            (b"<rss>", (b"text/html",), b"application/rss+xml"),
+        ],
+    )
+    def test_extract_mime_buffers(self, tmp_path, body, content_types, expected):
+        if isinstance(body, str):
+            with open(f"tests/files/{body}", "rb") as input_file:
+                body = input_file.read()
+        body = body.ljust(RESOURCE_HEADER_BUFFER_LENGTH)
+        path = tmp_path / "body"
+        path.write_bytes(body)
+        with open(path, "rb") as input_file:
+            with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for buffer in (
+                    bytearray(body),
+                    memoryview(body),
+                    memoryview(b"_" + body)[1:],
+                    array.array("B", body),
+                    memoryview(body).cast("c"),
+                    mapped,
+                ):
+                    assert extract_mime(buffer, content_types=content_types) == expected
+
+    @pytest.mark.parametrize(
+        "body,content_types",
+        [
+            (b"<html>", None),
+            (b"GIF89a", None),
+            (b"plain text ", None),
+            (b"\x00", None),
+            (b"plain text ", (b"text/plain",)),
+            (b"<rss>", (b"text/html",)),
+            (b"<html>", (b"text/html",)),
+            (b"  \n<html>", None),
+        ],
+    )
+    @pytest.mark.parametrize("buffer_type", [bytes, bytearray, memoryview])
+    def test_extract_mime_allocations(self, body, content_types, buffer_type):
+        def peak_allocation(body):
+            for _ in range(3):
+                extract_mime(body, content_types=content_types)
+            tracemalloc.start()
+            try:
+                extract_mime(body, content_types=content_types)
+                tracemalloc.clear_traces()
+                before, _ = tracemalloc.get_traced_memory()
+                for _ in range(100):
+                    extract_mime(body, content_types=content_types)
+                after, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            assert after == before
+            return peak
+
+        # Sniffing a much longer body than the resource header buffer must not
+        # allocate more than sniffing one that barely exceeds it, e.g. to copy
+        # the buffer.
+        short_body = buffer_type(body * (2 * RESOURCE_HEADER_BUFFER_LENGTH // len(body)))
+        long_body = buffer_type(body * (1_000_000 // len(body)))
+        assert peak_allocation(long_body) <= peak_allocation(short_body) + 256
+
+    @pytest.mark.parametrize(
+        "body,content_types,http_origin,no_sniff",
+        [
+            (b"plain text ", (b"text/plain",), True, False),
+            (b"plain text ", (b"text/plain",), False, False),
+            (b"<rss>", (b"text/plain",), True, True),
+            (b"GIF89a", (b"image/gif",), True, False),
+            (b"<html>", (b"text/html",), True, False),
+            (b" \n <html>", (b"text/html",), True, False),
+        ],
+    )
+    @pytest.mark.parametrize("buffer_type", (bytes, bytearray))
+    def test_extract_mime_no_allocations(
+        self, body, content_types, http_origin, no_sniff, buffer_type
+    ):
+        def sniff():
+            extract_mime(
+                body, content_types=content_types, http_origin=http_origin, no_sniff=no_sniff
+            )
+
+        # Bodies are short enough for their offsets to be cached integers.
+        body = buffer_type(body * (256 // len(body)))
+        for _ in range(3):
+            sniff()
+        tracemalloc.start()
+        try:
+            sniff()
+            tracemalloc.clear_traces()
+            sniff()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        assert peak == 0
@@ -0,0 +1,174 @@
+import sys
+
+import pytest
+
+from xtractmime import PatternArena, Sniffer, _arena_index, extract_mime
+from xtractmime.signatures import load_magic, load_signatures
+
+SIGNATURES = b"""# Sample signature file
+application/x-foo   464f4f00                    # FOO\\0
+application/x-bar   4:42415200    ffffdfff
+text/x-baz          3c62617a      ffdfdfdf      090a0c0d20
+application/x-qux   517578        -
+"""
+
+
+def magic_rule(offset, value, indent=0, mask=None, word_size=None, range_length=None):
+    rule = b"%d>%d=" % (indent, offset) if indent else b">%d=" % offset
+    rule += len(value).to_bytes(2, "big") + value
+    if mask is not None:
+        rule += b"&" + mask
+    if word_size is not None:
+        rule += b"~%d" % word_size
+    if range_length is not None:
+        rule += b"+%d" % range_length
+    return rule + b"\n"
+
+
+def magic_file(tmp_path, *sections):
+    data = b"MIME-Magic\0\n"
+    for priority, mime_type, rules in sections:
+        data += b"[%d:%s]\n" % (priority, mime_type) + b"".join(rules)
+    path = tmp_path / "magic"
+    path.write_bytes(data)
+    return path
+
+
+class TestSignatures:
+    def test_load_signatures(self, tmp_path):
+        path = tmp_path / "signatures.txt"
+        path.write_bytes(SIGNATURES)
+        extra_types = load_signatures(path)
+        assert isinstance(extra_types, PatternArena)
+        assert list(extra_types) == [
+            (b"FOO\x00", b"\xff\xff\xff\xff", None, b"application/x-foo"),
+            (
+                b"\x00" * 4 + b"BAR\x00",
+                b"\x00" * 4 + b"\xff\xff\xdf\xff",
+                None,
+                b"application/x-bar",
+            ),
+            (b"<BAZ", b"\xff\xdf\xdf\xdf", {b"\t", b"\n", b"\x0c", b"\r", b" "}, b"text/x-baz"),
+            (b"Qux", b"\xff\xff\xff", None, b"application/x-qux"),
+        ]
+        sniffer = Sniffer(extra_types=extra_types)
+        assert sniffer.sniff(b"FOO\x00\x01") == b"application/x-foo"
+        assert sniffer.sniff(b"\x00\x01\x02\x03BAr\x00") == b"application/x-bar"
+        assert sniffer.sniff(b"\x00\x01\x02\x03Bar\x00") == b"application/octet-stream"
+        assert sniffer.sniff(b" \n<BAZ>") == b"text/x-baz"
+        assert sniffer.sniff(b"Qux") == b"application/x-qux"
+
+    @pytest.mark.parametrize(
+        "line",
+        [
+            b"application/x-foo",
+            b"application/x-foo 464f4f0",
+            b"application/x-foo 464f4f00 ffff",
+            b"application/x-foo x:464f4f00",
+            b"application/x-foo 1442:464f4f00",
+            b"application/x-foo 464f4f00 - 20 20",
+        ],
+    )
+    def test_load_signatures_invalid(self, tmp_path, line):
+        path = tmp_path / "signatures.txt"
+        path.write_bytes(b"# Comment\n\n" + line + b"\n")
+        with pytest.raises(ValueError, match=r"signatures\.txt:3: invalid signature"):
+            load_signatures(path)
+
+    def test_load_magic(self, tmp_path):
+        path = magic_file(
+            tmp_path,
+            (50, b"application/x-low", [magic_rule(0, b"LOW")]),
+            (
+                80,
+                b"application/x-nested",
+                [
+                    magic_rule(0, b"NEST"),
+                    magic_rule(8, b"A", indent=1),
+                    magic_rule(9, b"B", indent=2),
+                    magic_rule(8, b"C", indent=1),
+                    magic_rule(3, b"X", indent=1),
+                ],
+            ),
+            (
+                80,
+                b"application/x-range",
+                [
+                    magic_rule(0, b"RANGE"),
+                    magic_rule(6, b"R\x00", indent=1, mask=b"\xdf\x00", range_length=2),
+                ],
+            ),
+            (
+                90,
+                b"application/x-high",
+                [
+                    magic_rule(0, b"LOWER"),
+                    magic_rule(0, b"HIGH", range_length=100),
+                    magic_rule(1442, b"HIGH"),
+                ],
+            ),
+        )
+        extra_types = load_magic(path)
+        assert list(extra_types) == [
+            (b"LOWER", b"\xff" * 5, None, b"application/x-high"),
+            (
+                b"NEST\x00\x00\x00\x00AB",
+                b"\xff" * 4 + b"\x00" * 4 + b"\xff\xff",
+                None,
+                b"application/x-nested",
+            ),
+            (
+                b"NEST\x00\x00\x00\x00C",
+                b"\xff" * 4 + b"\x00" * 4 + b"\xff",
+                None,
+                b"application/x-nested",
+            ),
+            (b"RANGE\x00R\x00", b"\xff" * 5 + b"\x00\xdf\x00", None, b"application/x-range"),
+            (
+                b"RANGE\x00\x00R\x00",
+                b"\xff" * 5 + b"\x00\x00\xdf\x00",
+                None,
+                b"application/x-range",
+            ),
+            (b"LOW", b"\xff" * 3, None, b"application/x-low"),
+        ]
+        sniffer = Sniffer(extra_types=extra_types)
+        assert sniffer.sniff(b"LOWER") == b"application/x-high"
+        assert sniffer.sniff(b"NEST....AB") == b"application/x-nested"
+        assert sniffer.sniff(b"NEST....A") == b"text/plain"
+        assert sniffer.sniff(b"RANGE..r!") == b"application/x-range"
+        assert len(load_magic(path, max_range=100)) == 106
+        assert len(load_magic(path, max_range=1)) == 4
+
+    def test_load_magic_word_size(self, tmp_path):
+        path = magic_file(
+            tmp_path, (50, b"application/x-words", [magic_rule(0, b"\x01\x02", word_size=2)])
+        )
+        expected = b"\x02\x01" if sys.byteorder == "little" else b"\x01\x02"
+        assert list(load_magic(path)) == [(expected, b"\xff\xff", None, b"application/x-words")]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"MIME-Magic\n",
+            b"MIME-Magic\0\n>0=\x00\x01A\n",
+            b"MIME-Magic\0\n[50:text/x-a]\n>0=\x00\x02A\n",
+            b"MIME-Magic\0\n[50:text/x-a]\n>0=\x00\x01A",
+            b"MIME-Magic\0\n[50:text/x-a]\n1>0=\x00\x01A\n",
+            b"MIME-Magic\0\n[50:text/x-a]\nx>0=\x00\x01A\n",
+            b"MIME-Magic\0\n[50:text/x-a]\n>0=\x00\x03ABC~2\n",
+            b"MIME-Magic\0\n[high:text/x-a]\n>0=\x00\x01A\n",
+        ],
+    )
+    def test_load_magic_invalid(self, tmp_path, data):
+        path = tmp_path / "magic"
+        path.write_bytes(data)
+        with pytest.raises(ValueError, match="magic"):
+            load_magic(path)
+
+    def test_extract_mime_pattern_arena(self):
+        extra_types = PatternArena([(b"test", b"\xff\xff\xff\xff", None, b"text/test")])
+        _arena_index.cache_clear()
+        for _ in range(2):
+            assert extract_mime(b"test", extra_types=extra_types) == b"text/test"
+        assert _arena_index.cache_info().hits == 1
@@ -0,0 +1,155 @@
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from xtractmime import Sniffer
+from xtractmime.store import SniffStore
+
+
+class CountingSniffer(Sniffer):
+    __slots__ = ("calls",)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+
+    def sniff(self, body, **kwargs):
+        self.calls += 1
+        return super().sniff(body, **kwargs)
+
+
+def count_rows(path):
+    with sqlite3.connect(path) as connection:
+        return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+def read_stored(path, keys):
+    with SniffStore(path) as store:
+        return [store.get(key) for key in keys]
+
+
+def store_results(path, keys):
+    with SniffStore(path, batch_size=10) as store:
+        return [store.sniff(key, b"GIF89a") for key in keys]
+
+
+class TestStore:
+    def test_sniff(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        sniffer = CountingSniffer()
+        with SniffStore(path, sniffer=sniffer) as store:
+            assert store.sniff("http://example.com/", b"GIF89a") == b"image/gif"
+            assert store.sniff("http://example.com/", b"<html>") == b"image/gif"
+            assert sniffer.calls == 1
+            assert store.sniff("http://example.com/", b"<html>", etag='"2"') == b"text/html"
+            assert (
+                store.sniff("http://example.com/", b"GIF89a", content_types=(b"text/html",))
+                == b"text/html"
+            )
+            assert (
+                store.sniff(
+                    "http://example.com/",
+                    b"<html>",
+                    content_types=(b"Text/HTML ; charset=utf-8",),
+                )
+                == b"text/html"
+            )
+            assert store.sniff("http://example.com/", b"GIF89a", no_sniff=True) == b"image/gif"
+            assert sniffer.calls == 4
+
+        sniffer = CountingSniffer()
+        with SniffStore(path, sniffer=sniffer) as store:
+            assert store.get("http://example.com/") == b"image/gif"
+            assert store.get("http://example.com/", etag='"2"') == b"text/html"
+            assert store.get("http://example.com/other") is None
+            assert store.sniff("http://example.com/", b"<html>") == b"image/gif"
+            assert sniffer.calls == 0
+
+    def test_apache_type(self, tmp_path):
+        with SniffStore(tmp_path / "store.sqlite") as store:
+            apache_type = (b"text/plain; charset=ISO-8859-1",)
+            body = b"\x00\x01"
+            assert store.sniff("key", body, content_types=apache_type) == (
+                b"application/octet-stream"
+            )
+            assert store.sniff("key", body, content_types=(b"text/plain; charset=utf-8",)) == (
+                b"text/plain"
+            )
+
+    def test_sniff_path(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        with SniffStore(path) as store:
+            assert store.sniff_path("foo.gif", "tests/files/foo.gif") == b"image/gif"
+            assert store.sniff_path("foo.gif", tmp_path / "missing") == b"image/gif"
+            with open("tests/files/foo.html", "rb") as file:
+                assert store.sniff_file("foo.html", file) == b"text/html"
+                position = file.tell()
+                assert store.sniff_file("foo.html", file) == b"text/html"
+                assert file.tell() == position
+
+    def test_batched_writes(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        with SniffStore(path, batch_size=3) as store:
+            store.sniff("a", b"GIF89a")
+            store.sniff("b", b"GIF89a")
+            assert count_rows(path) == 0
+            store.sniff("c", b"GIF89a")
+            assert count_rows(path) == 3
+            store.sniff("d", b"GIF89a")
+            store.flush()
+            assert count_rows(path) == 4
+            store.sniff("e", b"GIF89a")
+        assert count_rows(path) == 5
+
+    def test_eviction(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        with SniffStore(path, max_entries=3, batch_size=1) as store:
+            for key in "abcd":
+                store.sniff(key, b"GIF89a")
+            store.sniff("b", b"GIF89a", etag="1")
+            assert count_rows(path) == 3
+            assert [store.get(key) for key in "abcd"] == [None, None, b"image/gif", b"image/gif"]
+            assert store.get("b", etag="1") == b"image/gif"
+
+    def test_options(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        with SniffStore(path) as store:
+            store.sniff("key", b"test")
+        with SniffStore(path, sniffer=Sniffer()) as store:
+            assert store.get("key") == b"text/plain"
+        extra_types = ((b"test", b"\xff\xff\xff\xff", {b" "}, b"text/test"),)
+        with SniffStore(path, sniffer=Sniffer(extra_types=extra_types)) as store:
+            assert store.get("key") is None
+            assert store.sniff("key", b"test") == b"text/test"
+        with SniffStore(path, sniffer=Sniffer(extra_types=extra_types)) as store:
+            assert store.get("key") == b"text/test"
+        with SniffStore(path) as store:
+            assert store.get("key") == b"text/plain"
+
+    def test_options_shared_database(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        extra_types = ((b"test", b"\xff\xff\xff\xff", {b" "}, b"text/test"),)
+        other_extra_types = ((b"test", b"\xff\xff\xff\xff", None, b"text/other"),)
+        sniffer = Sniffer(extra_types=extra_types)
+        other_sniffer = Sniffer(extra_types=other_extra_types)
+        with SniffStore(path, sniffer=sniffer, batch_size=1) as store:
+            with SniffStore(path, sniffer=other_sniffer, batch_size=1) as other_store:
+                assert store.sniff("key", b"test") == b"text/test"
+                assert other_store.get("key") is None
+                assert other_store.sniff("key", b"test") == b"text/other"
+                assert store.get("key") == b"text/test"
+                assert count_rows(path) == 2
+
+    def test_processes(self, tmp_path):
+        path = tmp_path / "store.sqlite"
+        keys = [str(index) for index in range(100)]
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            list(executor.map(store_results, [path] * 4, [keys[index::4] for index in range(4)]))
+            results = list(executor.map(read_stored, [path] * 8, [keys] * 8))
+        assert results == [[b"image/gif"] * len(keys)] * 8
+
+    @pytest.mark.parametrize("options", [{"max_entries": 0}, {"batch_size": 0}])
+    def test_invalid(self, tmp_path, options):
+        with pytest.raises(ValueError):
+            SniffStore(tmp_path / "store.sqlite", **options)
@@ -1,11 +1,21 @@
 import os
+import pickle
+import subprocess
+import sys
 import pytest
 
 from unittest import mock
 from xtractmime._utils import is_match_mime_pattern
-from xtractmime._patterns import WHITESPACE_BYTES
+from xtractmime._patterns import TEXT_PATTERNS, WHITESPACE_BYTES
 
+from xtractmime import _utils
 from xtractmime._utils import (
+    NeedMoreData,
+    PatternArena,
+    PatternIndex,
+    PatternList,
+    TextPatternIndex,
+    find_signatures,
     get_archive_mime,
     get_audio_video_mime,
     get_extra_mime,
@@ -16,9 +26,13 @@ from xtractmime._utils import (
     is_mp4_signature,
     is_webm_signature,
     match_mp3_header,
+    may_be_mp3_non_ID3_signature,
+    may_be_mp4_signature,
+    may_be_webm_signature,
     mp3_framesize,
     parse_mp3_frame,
     parse_vint_number_size,
+    skip_whitespace,
 )
 
 
@@ -210,3 +224,283 @@ class TestUtils:
     def test_archive(self):
         assert get_archive_mime(self.body_zip) == b"application/zip"
         assert get_archive_mime(bytes.fromhex("00000000")) is None
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            (b"ab", b"first"),
+            (b"aB", b"second"),
+            (b"  ab", b"stripped"),
+            (b"xyz", b"unkeyed"),
+            (b"  ", None),
+            (b"", None),
+        ],
+    )
+    def test_pattern_index(self, input_bytes, expected):
+        index = PatternIndex(
+            (
+                (b"ab", b"\xff\xff", None, b"first"),
+                (b"AB", b"\xdf\xdf", None, b"second"),
+                (b"ab", b"\xff\xff", WHITESPACE_BYTES, b"stripped"),
+                (b"\x00\x00\x00", b"\x00\x00\x00", None, b"unkeyed"),
+            )
+        )
+        assert index.match(input_bytes) == expected
+        order = index.find(input_bytes)
+        assert (None if order is None else index.patterns[order][3]) == expected
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            (b"ab", [0, 1, 2]),
+            (b"aB", [1]),
+            (b"  ab", [2, 3]),
+            (b"\x00\x00\x00", [3]),
+            (b"xyz", [3]),
+            (b"", []),
+        ],
+    )
+    def test_pattern_index_find_all(self, input_bytes, expected):
+        patterns = (
+            (b"ab", b"\xff\xff", None, b"first"),
+            (b"AB", b"\xdf\xdf", None, b"second"),
+            (b"ab", b"\xff\xff", WHITESPACE_BYTES, b"stripped"),
+            (b"\x00\x00\x00", b"\x00\x00\x00", None, b"unkeyed"),
+        )
+        assert PatternIndex(patterns).find_all(input_bytes) == expected
+        assert PatternList(patterns).find_all(memoryview(input_bytes)) == expected
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            (b"", []),
+            (b"GIF89a", [("image", b"image/gif")]),
+            (b"  <html>", [("text", b"text/html")]),
+            (b"\x00\x01\x00\x00", [("font", b"font/ttf")]),
+            (
+                b"\x00\x00\x01\x00ftypmp42" + bytes(244),
+                [("image", b"image/x-icon"), ("audio/video", b"video/mp4")],
+            ),
+            (
+                b"\x00\x00\x00\x18ftypmp42\x00\x00\x00\x00mp42isom",
+                [("audio/video", b"video/mp4")],
+            ),
+            (b"PK\x03\x04", [("archive", b"application/zip")]),
+        ],
+    )
+    def test_find_signatures(self, input_bytes, expected):
+        assert find_signatures(input_bytes) == expected
+
+    def test_pattern_index_invalid(self):
+        with pytest.raises(ValueError):
+            PatternIndex(((b"ab", b"\xff", None, b"text/test"),))
+
+    def test_pattern_arena(self):
+        patterns = (
+            (b"ab", b"\xff\xff", None, b"first"),
+            (b"AB", b"\xdf\xdf", set(), b"second"),
+            (b"ab", b"\xff\xff", WHITESPACE_BYTES | {b"ab"}, b"first"),
+            (b"", b"", WHITESPACE_BYTES, b"empty"),
+        )
+        arena = PatternArena(iter(patterns))
+        assert len(arena) == 4
+        assert list(arena) == [
+            (b"ab", b"\xff\xff", None, b"first"),
+            (b"AB", b"\xdf\xdf", None, b"second"),
+            (b"ab", b"\xff\xff", WHITESPACE_BYTES, b"first"),
+            (b"", b"", WHITESPACE_BYTES, b"empty"),
+        ]
+        assert arena[-1] == arena[3] and arena[1:3] == (arena[1], arena[2])
+        assert arena.mime_type(2) == b"first"
+        assert len(arena._mime_types) == 3 and len(arena._strips) == 2
+        assert list(pickle.loads(pickle.dumps(arena))) == list(arena)
+        assert PatternIndex(arena).patterns is arena
+        with pytest.raises(IndexError):
+            arena[4]
+        with pytest.raises(ValueError):
+            PatternArena(((b"ab", b"\xff", None, b"text/test"),))
+
+    @pytest.mark.parametrize(
+        "input_bytes,offset,complete,expected",
+        [
+            (b"RIFF1234WAVE", 0, True, True),
+            (b"riff1234WAVE", 0, True, False),
+            (b" RIFFxxxxWAVEfmt", 1, True, True),
+            (b"RIFF1234WAV", 0, True, False),
+            (b"RIFF1234WAV", 0, False, NeedMoreData),
+            (b"RIFX1234", 0, False, False),
+            (b"", 0, False, NeedMoreData),
+        ],
+    )
+    def test_pattern_arena_match_at(self, input_bytes, offset, complete, expected):
+        arena = PatternArena(
+            (
+                (b"GIF8", b"\xff\xff\xff\xff", None, b"image/gif"),
+                (b"RIFF\x00\x00\x00\x00WAVE", b"\xff" * 4 + b"\x00" * 4 + b"\xff" * 4, None, b"w"),
+            )
+        )
+        if expected is NeedMoreData:
+            with pytest.raises(NeedMoreData):
+                arena.match_at(1, input_bytes, offset, complete)
+        else:
+            assert arena.match_at(1, input_bytes, offset, complete) is expected
+            assert arena.match_at(1, memoryview(input_bytes), offset, complete) is expected
+
+    @pytest.mark.parametrize(
+        "input_bytes",
+        [b"ab", b"aB", b"  ab", b"xyz", b"  ", b"", b"a"],
+    )
+    def test_pattern_list(self, input_bytes):
+        patterns = (
+            (b"ab", b"\xff\xff", None, b"first"),
+            (b"AB", b"\xdf\xdf", None, b"second"),
+            (b"ab", b"\xff\xff", WHITESPACE_BYTES, b"stripped"),
+            (b"\x00\x00\x00", b"\x00\x00\x00", None, b"unkeyed"),
+        )
+        expected = PatternIndex(patterns).find(input_bytes)
+        for buffer in (input_bytes, bytearray(input_bytes), memoryview(input_bytes)):
+            assert PatternList(patterns).find(buffer) == expected
+            assert PatternIndex(patterns).find(buffer) == expected
+        assert PatternList(patterns).match(input_bytes) == PatternIndex(patterns).match(
+            input_bytes
+        )
+
+    @pytest.mark.parametrize(
+        "input_bytes",
+        [
+            b"<html>",
+            b" \t\r\n\x0c<HtMl ",
+            b"\n" * 5000 + b"<!doctype html>",
+            b"<!DOCTYPE HTML",
+            b"<!-- a -->",
+            b"<!--a-->",
+            b"<h1>",
+            b"<H2>",
+            b"<?xml",
+            b"<?XML",
+            b"  %PDF-",
+            b"%PDF-",
+            b"<a",
+            b"<",
+            b"   ",
+            b"",
+        ],
+    )
+    def test_text_pattern_index(self, input_bytes):
+        expected = PatternIndex(TEXT_PATTERNS).find(input_bytes)
+        index = TextPatternIndex(TEXT_PATTERNS)
+        assert index.find(input_bytes) == expected
+        assert index.find(memoryview(input_bytes)) == expected
+
+    def test_text_pattern_index_order(self):
+        patterns = (
+            (b"%PDF", b"\xff\xff\xff\xff", None, b"first"),
+            (b"<A>", b"\xff\xdf\xff", WHITESPACE_BYTES, b"tag"),
+            (b"<\x00>", b"\xff\x00\xff", WHITESPACE_BYTES, b"any"),
+            (b"<a>", b"\xff\xff\xff", WHITESPACE_BYTES, b"lower"),
+        )
+        index = TextPatternIndex(patterns)
+        assert index.match(b" <a>") == b"tag"
+        assert index.match(b" <b>") == b"any"
+        with pytest.raises(ValueError):
+            TextPatternIndex(((b"<A>", b"\xff\xdf\xff", {b"x"}, b"tag"),))
+
+    @pytest.mark.parametrize(
+        "input_bytes,offset,expected",
+        [(b"", 0, 0), (b"a", 0, 0), (b" \t\na", 0, 3), (b"a  b", 1, 3), (b"   ", 1, 3)],
+    )
+    def test_skip_whitespace(self, input_bytes, offset, expected):
+        assert skip_whitespace(input_bytes, offset) == expected
+
+    def test_pattern_list_invalid(self):
+        with pytest.raises(ValueError):
+            PatternList(((b"ab", b"\xff", None, b"text/test"),)).match(b"ab")
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            (b"a", b"first"),
+            (b"ab", b"first"),
+            (b" ", NeedMoreData),
+            (b"  a", NeedMoreData),
+            (b"  ab", b"stripped"),
+            (b"b", None),
+        ],
+    )
+    def test_pattern_index_incomplete(self, input_bytes, expected):
+        index = PatternIndex(
+            (
+                (b"a", b"\xff", None, b"first"),
+                (b"ab", b"\xff\xff", WHITESPACE_BYTES, b"stripped"),
+            )
+        )
+        if expected is NeedMoreData:
+            with pytest.raises(NeedMoreData):
+                index.match(input_bytes, complete=False)
+        else:
+            assert index.match(input_bytes, complete=False) == expected
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            ("000000", True),
+            ("00000001", False),
+            (("00000020", b"ftyp"), True),
+            (("00000020", b"free"), False),
+            (("0000000c", b"ftypisom"), False),
+        ],
+    )
+    def test_may_be_mp4_signature(self, input_bytes, expected):
+        assert may_be_mp4_signature(self.get_byte_seq(input_bytes)) == expected
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            ("1a 45", True),
+            ("1a 45 df a3 42 82", True),
+            ("1a 46", False),
+            (("1a 45 df a3", "00" * 48), False),
+        ],
+    )
+    def test_may_be_webm_signature(self, input_bytes, expected):
+        assert may_be_webm_signature(self.get_byte_seq(input_bytes)) == expected
+
+    @pytest.mark.parametrize(
+        "input_bytes,expected",
+        [
+            ("ff fb", True),
+            ("ff fb 90 64", True),
+            ("00 00 00 00", False),
+            ("NonID3.mp3", False),
+        ],
+    )
+    def test_may_be_mp3_non_ID3_signature(self, input_bytes, expected):
+        assert may_be_mp3_non_ID3_signature(self.get_byte_seq(input_bytes)) == expected
+
+    def test_indexes_built_lazily(self):
+        code = "from xtractmime import _utils; print(_utils.pattern_index.cache_info().currsize)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, check=True, text=True
+        ).stdout
+        assert output == "0\n"
+        assert _utils.TEXT_INDEX is _utils.pattern_index("TEXT_INDEX")
+        with pytest.raises(AttributeError):
+            _utils.MISSING_INDEX
+
+    def test_indexes_not_modified(self):
+        indexes = {name: getattr(_utils, name) for name in _utils._INDEXED_PATTERNS}
+        indexes["_signature_index"] = _utils._signature_index()[0]
+        before = {name: pickle.dumps(vars(index)) for name, index in indexes.items()}
+        for name in sorted(os.listdir("tests/files")):
+            with open(f"tests/files/{name}", "rb") as input_file:
+                input_bytes = input_file.read()
+            for index in indexes.values():
+                index.match(input_bytes)
+                index.find_all(input_bytes)
+                for size in range(0, 64, 7):
+                    try:
+                        index.find(input_bytes[:size], complete=False)
+                    except NeedMoreData:
+                        pass
+            find_signatures(input_bytes)
+        assert {name: pickle.dumps(vars(index)) for name, index in indexes.items()} == before
@@ -0,0 +1,118 @@
+import gzip
+import io
+
+import pytest
+
+from xtractmime import Sniffer
+from xtractmime.warc import WarcRecord, sniff_warc
+
+
+def warc_record(record_type, block, headers=b""):
+    return (
+        b"WARC/1.0\r\n"
+        b"WARC-Type: " + record_type + b"\r\n"
+        b"WARC-Record-ID: <urn:uuid:" + record_type + b">\r\n"
+        b"WARC-Target-URI: http://example.com/\r\n"
+        + headers
+        + b"Content-Length: "
+        + str(len(block)).encode()
+        + b"\r\n\r\n"
+        + block
+        + b"\r\n\r\n"
+    )
+
+
+def http_response(payload, headers=b""):
+    return warc_record(
+        b"response",
+        b"HTTP/1.1 200 OK\r\n" + headers + b"\r\n" + payload,
+        b"Content-Type: application/http; msgtype=response\r\n",
+    )
+
+
+RECORDS = [
+    warc_record(b"warcinfo", b"software: test\r\n", b"Content-Type: application/warc-fields\r\n"),
+    http_response(b"GIF89a" + b"\x00" * 100_000, b"Content-Type: application/unknown\r\n"),
+    warc_record(b"request", b"GET / HTTP/1.1\r\n\r\n"),
+    http_response(b"<html>", b"Content-Type: image/png\r\nX-Content-Type-Options: nosniff\r\n"),
+    http_response(
+        b"3\r\n%PD\r\n2;ext\r\nF-\r\n0\r\n\r\n",
+        b"Transfer-Encoding: chunked\r\n",
+    ),
+    http_response(b"<rss>", b"Content-Type: text/plain\r\nContent-Type: text/html\r\n"),
+    warc_record(b"resource", b"\x89PNG\r\n\x1a\n", b"Content-Type: text/plain\r\n"),
+]
+
+EXPECTED = [
+    ("response", (b"application/unknown",), False, b"image/gif"),
+    ("response", (b"image/png",), True, b"image/png"),
+    ("response", None, False, b"application/pdf"),
+    ("response", (b"text/plain", b"text/html"), False, b"application/rss+xml"),
+    ("resource", (b"text/plain",), False, b"application/octet-stream"),
+]
+
+
+class TestWarc:
+    def check(self, records):
+        assert [
+            (record.record_type, record.content_types, record.no_sniff, record.mime_type)
+            for record in records
+        ] == EXPECTED
+        assert all(record.target_uri == "http://example.com/" for record in records)
+        assert records[0].record_id == "<urn:uuid:response>"
+
+    def test_uncompressed_path(self, tmp_path):
+        path = tmp_path / "test.warc"
+        path.write_bytes(b"".join(RECORDS))
+        self.check(list(sniff_warc(path)))
+        self.check(list(sniff_warc(str(path))))
+
+    def test_gzip_path(self, tmp_path):
+        path = tmp_path / "test.warc.gz"
+        path.write_bytes(b"".join(gzip.compress(record) for record in RECORDS))
+        self.check(list(sniff_warc(path)))
+
+    @pytest.mark.parametrize("compress", [False, True])
+    def test_file(self, compress):
+        data = b"".join(RECORDS)
+        if compress:
+            data = gzip.compress(data)
+        self.check(list(sniff_warc(io.BytesIO(data))))
+
+    def test_reads_only_header_buffer(self):
+        class CountingReader(io.BytesIO):
+            read_size = 0
+
+            def read(self, size=-1):
+                data = super().read(size)
+                self.read_size += len(data)
+                return data
+
+        data = b"".join(RECORDS)
+        reader = CountingReader(data)
+        self.check(list(sniff_warc(reader)))
+        assert reader.read_size < len(data) - 90_000
+
+    def test_sniffer_options(self):
+        records = list(sniff_warc(io.BytesIO(RECORDS[-1]), sniffer=Sniffer(http_origin=False)))
+        assert records == [
+            WarcRecord(
+                record_type="resource",
+                record_id="<urn:uuid:resource>",
+                target_uri="http://example.com/",
+                content_types=(b"text/plain",),
+                no_sniff=False,
+                mime_type=b"text/plain",
+            )
+        ]
+
+    @pytest.mark.parametrize(
+        "data",
+        [
+            b"not a WARC file\r\n",
+            b"WARC/1.0\r\nWARC-Type: response\r\n\r\n",
+        ],
+    )
+    def test_invalid(self, data):
+        with pytest.raises(ValueError):
+            list(sniff_warc(io.BytesIO(data)))
@@ -1,194 +1,375 @@
 __version__ = "0.2.1"
+import os
 import re
-from typing import Optional, Set, Tuple
-from xtractmime._patterns import _APACHE_TYPES, BINARY_BYTES, WHITESPACE_BYTES
+from collections import OrderedDict
+from functools import lru_cache
+from time import perf_counter
+from typing import (
+    AsyncIterable,
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TYPE_CHECKING,
+    Union,
+    cast,
+)
+from xtractmime._patterns import _APACHE_TYPES, BINARY_BYTES
 from xtractmime._utils import (
+    MimePattern,
+    NeedMoreData,
+    PatternArena,
+    PatternIndex,
+    find_signatures,
+    PatternList,
     get_archive_mime,
     get_audio_video_mime,
-    get_extra_mime,
     get_image_mime,
     get_text_mime,
+    is_mp3_non_ID3_signature,
+    is_mp4_signature,
+    is_webm_signature,
+    pattern_index,
+    skip_whitespace,
+)
+from xtractmime.mimegroups import (
+    is_audio_video_mime_type,
+    is_html_mime_type,
+    is_image_mime_type,
+    is_xml_mime_type,
 )
-from xtractmime.mimegroups import is_audio_video_mime_type, is_html_mime_type, is_image_mime_type
+
+try:
+    from typing import Protocol
+except ImportError:  # Python 3.7
+    Protocol = object  # type: ignore
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from xtractmime._vectorized import VectorizedPatterns
 
 RESOURCE_HEADER_BUFFER_LENGTH = 1445
 
+#: Minimum number of bodies with an unknown supplied MIME type for which
+#: :meth:`Sniffer.sniff_many` uses NumPy by default.
+VECTORIZED_MIN_BATCH_SIZE = 256
+
+#: Maximum number of pattern arenas passed as *extra_types* to the functions
+#: that sniff a single resource whose index is cached.
+_ARENA_INDEX_CACHE_SIZE = 8
+
+_BINARY_DATA = re.compile(b"[" + re.escape(b"".join(BINARY_BYTES)) + b"]")
+
+
+class AsyncReader(Protocol):
+    """Object that reads bytes asynchronously, such as
+    :class:`asyncio.StreamReader`."""
+
+    async def read(self, n: int) -> bytes:
+        ...
+
 
 def is_binary_data(input_bytes: bytes) -> bool:
-    for i in input_bytes:
-        if bytes([i]) in BINARY_BYTES:
-            return True
+    return _BINARY_DATA.search(input_bytes) is not None
 
-    return False
 
+class Trace:
+    """Record of how a MIME type was determined.
 
-def _find_unknown_mimetype(
-    input_bytes: bytes,
-    sniff_scriptable: bool,
-    extra_types: Optional[Tuple[Tuple[bytes, bytes, Optional[Set[bytes]], bytes], ...]],
-) -> Optional[bytes]:
-    if sniff_scriptable:
-        matched_type = get_text_mime(input_bytes)
-        if matched_type:
-            return matched_type
+    Pass a trace as the *trace* argument of :func:`extract_mime` or
+    :meth:`Sniffer.sniff`. Afterwards, :attr:`rule` describes the rule that
+    decided the result, and :attr:`stages` lists the name and duration in
+    seconds of each stage that ran, in order. A trace records a single call.
+    """
 
-    matched_type = get_extra_mime(input_bytes, extra_types=extra_types)
-    if matched_type:
-        return matched_type
+    __slots__ = ("rule", "stages", "_stage", "_start")
 
-    matched_type = get_image_mime(input_bytes)
-    if matched_type:
-        return matched_type
+    def __init__(self) -> None:
+        self.rule: Optional[str] = None
+        self.stages: List[Tuple[str, float]] = []
 
-    matched_type = get_audio_video_mime(input_bytes)
-    if matched_type:
-        return matched_type
+    def __repr__(self) -> str:
+        return f"Trace(rule={self.rule!r}, stages={self.stages!r})"
 
-    matched_type = get_archive_mime(input_bytes)
-    if matched_type:
-        return matched_type
+    def _reset(self) -> None:
+        self.rule = None
+        self.stages = []
 
-    if not is_binary_data(input_bytes):
-        return b"text/plain"
+    def _enter(self, stage: str) -> None:
+        self._stage = stage
+        self._start = perf_counter()
 
-    return b"application/octet-stream"
+    def _exit(self, decided: object, describe: Optional[Callable[..., str]] = None, *args) -> None:
+        self.stages.append((self._stage, perf_counter() - self._start))
+        if decided and describe is not None:
+            self.rule = describe(*args)
 
 
-def _sniff_mislabled_binary(input_bytes: bytes) -> Optional[bytes]:
+class MimeCandidate(NamedTuple):
+    """MIME type whose signature matches a resource, and the group of the
+    signature: ``"text"``, ``"extra"``, ``"extra_types"``, ``"image"``,
+    ``"audio/video"``, ``"font"`` or ``"archive"``."""
 
-    if input_bytes[:2] in (bytes.fromhex("fe ff"), bytes.fromhex("ff fe")) or input_bytes[
-        :3
-    ] == bytes.fromhex("ef bb bf"):
-        return b"text/plain"
+    group: str
+    mime_type: bytes
 
-    if not is_binary_data(input_bytes):
-        return b"text/plain"
 
-    return b"application/octet-stream"
+class Classification(NamedTuple):
+    """Result of :meth:`Sniffer.classify`."""
 
+    #: Same result as :func:`extract_mime`.
+    mime_type: Optional[bytes]
+    #: Every signature that matches the resource, in the order in which the
+    #: MIME Sniffing Standard matches them.
+    candidates: Tuple[MimeCandidate, ...]
 
-def _sniff_mislabled_feed(input_bytes: bytes, supplied_type: bytes) -> Optional[bytes]:
-    input_size = len(input_bytes)
-    index = 0
+    @property
+    def groups(self) -> Set[str]:
+        """Groups of :attr:`candidates`."""
+        return {candidate.group for candidate in self.candidates}
 
-    if input_bytes[:3] == bytes.fromhex("ef bb bf"):
-        index += 3
 
-    while index < input_size:
-        while True:
-            if not input_bytes[index : index + 1]:
-                return supplied_type
+def _pattern_rule(
+    name: str, patterns: Union[PatternIndex, PatternList], input_bytes: bytes
+) -> str:
+    order = patterns.find(input_bytes)
+    if order is None:
+        raise AssertionError(f"no {name} pattern matches")
+    return f"{name}[{order}] {patterns.patterns[order][0]!r}"
 
-            if input_bytes[index : index + 1] == b"<":
-                index += 1
-                break
 
-            if input_bytes[index : index + 1] not in WHITESPACE_BYTES:
-                return supplied_type
+def _audio_video_rule(input_bytes: bytes) -> str:
+    if pattern_index("AUDIO_VIDEO_INDEX").find(input_bytes) is not None:
+        return _pattern_rule(
+            "AUDIO_VIDEO_PATTERNS", pattern_index("AUDIO_VIDEO_INDEX"), input_bytes
+        )
+    for signature in (is_mp4_signature, is_webm_signature, is_mp3_non_ID3_signature):
+        if signature(input_bytes):
+            return signature.__name__
+    raise AssertionError("no audio or video signature matches")
 
-            index += 1
 
-        while True:
-            loop_break = False
-            if not input_bytes[index : index + 1]:
-                return supplied_type
+def _binary_rule(check: str, input_bytes: bytes) -> str:
+    binary_byte = _BINARY_DATA.search(input_bytes)
+    if binary_byte is None:
+        return f"{check}: no binary data bytes"
+    return f"{check}: binary data byte at offset {binary_byte.start()}"
 
-            if input_bytes[index : index + 3] == b"!--":
-                index += 3
-                while True:
-                    if not input_bytes[index : index + 1]:
-                        return supplied_type
 
-                    if input_bytes[index : index + 3] == b"-->":
-                        index += 3
-                        loop_break = True
-                        break
+def _apache_rule(input_bytes: bytes) -> str:
+    if _starts_with_bom(input_bytes):
+        return "apache binary check: BOM"
+    return _binary_rule("apache binary check", input_bytes)
 
-                    index += 1
 
-            if loop_break:
-                break
+def _byte_view(body: bytes) -> memoryview:
+    """Return a view of the bytes of *body*, which can be any contiguous
+    buffer, without copying them."""
+    view = memoryview(body)
+    if view.format != "B" or view.ndim != 1:
+        view = view.cast("B")
+    return view
 
-            if input_bytes[index : index + 1] == b"!":
-                index += 1
-                while True:
-                    if not input_bytes[index : index + 1]:
-                        return supplied_type
 
-                    if input_bytes[index : index + 1] == b">":
-                        index += 1
-                        loop_break = True
-                        break
+def _resource_header(body: bytes) -> bytes:
+    """Return the first :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes of *body*,
+    which can be any contiguous buffer, without copying them.
 
-                    index += 1
+    A ``bytes`` or ``bytearray`` body that fits in the resource header is
+    returned as is, so that sniffing it allocates nothing.
+    """
+    if isinstance(body, (bytes, bytearray)) and len(body) <= RESOURCE_HEADER_BUFFER_LENGTH:
+        return body
+    return _byte_view(body)[:RESOURCE_HEADER_BUFFER_LENGTH]
+
+
+def _read_header(file: BinaryIO) -> memoryview:
+    """Return up to :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes read from
+    *file* into a preallocated buffer."""
+    header = memoryview(bytearray(RESOURCE_HEADER_BUFFER_LENGTH))
+    size = 0
+    readinto = getattr(file, "readinto", None)
+    while size < RESOURCE_HEADER_BUFFER_LENGTH:
+        if readinto is not None:
+            read_size = readinto(header[size:])
+        else:
+            chunk = file.read(RESOURCE_HEADER_BUFFER_LENGTH - size)
+            read_size = len(chunk)
+            header[size : size + read_size] = chunk
+        if not read_size:
+            break
+        size += read_size
+    return header[:size]
 
-            if loop_break:
-                break
 
-            if input_bytes[index : index + 1] == b"?":
-                index += 1
-                while True:
-                    if not input_bytes[index : index + 1]:
-                        return supplied_type
+def _find_unknown_mimetype(
+    input_bytes: bytes,
+    sniff_scriptable: bool,
+    extra_types: Optional[Sequence[MimePattern]],
+) -> Optional[bytes]:
+    sniffer = Sniffer._uncompiled(extra_types=extra_types)
+    return sniffer._find_unknown_mimetype(input_bytes, sniff_scriptable)
+
+
+_UTF_16_BOMS = (bytes.fromhex("fe ff"), bytes.fromhex("ff fe"))
+_UTF_8_BOM = bytes.fromhex("ef bb bf")
+_BOMS = (*_UTF_16_BOMS, _UTF_8_BOM)
+_BOM_PREFIXES = (
+    b"",
+    bytes.fromhex("fe"),
+    bytes.fromhex("ff"),
+    bytes.fromhex("ef"),
+    bytes.fromhex("ef bb"),
+)
+
+
+def _has_prefix(
+    input_bytes: bytes, prefix: Union[bytes, Tuple[bytes, ...]], start: int = 0
+) -> bool:
+    """Return whether *input_bytes* has *prefix*, or one of several, at
+    *start*, without allocating if *input_bytes* is ``bytes`` or
+    ``bytearray``."""
+    if not isinstance(input_bytes, memoryview):
+        return input_bytes.startswith(prefix, start)
+    for item in prefix if isinstance(prefix, tuple) else (prefix,):
+        if input_bytes[start : start + len(item)] == item:
+            return True
+    return False
+
 
-                    if input_bytes[index : index + 2] == b"?>":
-                        index += 2
-                        loop_break = True
-                        break
+def _starts_with_bom(input_bytes: bytes) -> bool:
+    return _has_prefix(input_bytes, _BOMS)
 
-                    index += 1
 
-            if loop_break:
-                break
+def _end_of_input(result: bytes, complete: bool) -> bytes:
+    """Return *result*, which was determined by reaching the end of the input
+    bytes, unless the input bytes are incomplete."""
+    if not complete:
+        raise NeedMoreData
+    return result
 
-            if input_bytes[index : index + 3] == b"rss":
-                return b"application/rss+xml"
 
-            if input_bytes[index : index + 4] == b"feed":
-                return b"application/atom+xml"
+def _sniff_mislabled_binary(input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
 
-            if input_bytes[index : index + 7] == b"rdf:RDF":
-                index += 7
-                while True:
-                    if not input_bytes[index : index + 1]:
-                        return supplied_type
+    if _starts_with_bom(input_bytes):
+        return b"text/plain"
 
-                    if input_bytes[index : index + 24] == b"http://purl.org/rss/1.0/":
-                        index += 24
-                        while True:
-                            if not input_bytes[index : index + 1]:
-                                return supplied_type
+    if not complete and input_bytes[:3] in _BOM_PREFIXES:
+        raise NeedMoreData
 
-                            if (
-                                input_bytes[index : index + 43]
-                                == b"http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-                            ):
-                                return b"application/rss+xml"
+    if not is_binary_data(input_bytes):
+        return _end_of_input(b"text/plain", complete)
 
-                            index += 1
+    return b"application/octet-stream"
 
-                    if (
-                        input_bytes[index : index + 43]
-                        == b"http://www.w3.org/1999/02/22-rdf-syntax-ns#"
-                    ):
-                        index += 43
-                        while True:
-                            if not input_bytes[index : index + 1]:
-                                return supplied_type
 
-                            if input_bytes[index : index + 24] == b"http://purl.org/rss/1.0/":
-                                return b"application/rss+xml"
+_RSS_NAMESPACE = b"http://purl.org/rss/1.0/"
+_RDF_NAMESPACE = b"http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+
+
+@lru_cache(maxsize=None)
+def _feed_patterns() -> Tuple[
+    "re.Pattern[bytes]",
+    "re.Pattern[bytes]",
+    "re.Pattern[bytes]",
+    "re.Pattern[bytes]",
+    Dict[bytes, "re.Pattern[bytes]"],
+]:
+    """Return the regular expressions of :func:`_sniff_mislabled_feed`, which
+    are only compiled once a supplied HTML MIME type is checked, since they
+    are not needed otherwise."""
+    return (
+        re.compile(re.escape(b"-->")),
+        re.compile(re.escape(b">")),
+        re.compile(re.escape(b"?>")),
+        re.compile(re.escape(_RSS_NAMESPACE) + b"|" + re.escape(_RDF_NAMESPACE)),
+        {
+            _RSS_NAMESPACE: re.compile(re.escape(_RDF_NAMESPACE)),
+            _RDF_NAMESPACE: re.compile(re.escape(_RSS_NAMESPACE)),
+        },
+    )
+
+
+def _sniff_mislabled_feed(
+    input_bytes: bytes, supplied_type: bytes, complete: bool = True, trace: Optional[Trace] = None
+) -> Optional[bytes]:
+    (
+        comment_end,
+        tag_end_pattern,
+        processing_instruction_end,
+        rss_or_rdf_namespace,
+        rss_1_namespaces,
+    ) = _feed_patterns()
+    input_size = len(input_bytes)
+    index = 0
 
-                            index += 1
+    if _has_prefix(input_bytes, _UTF_8_BOM):
+        index += 3
+    elif not complete and input_bytes[:3] in _BOM_PREFIXES[3:]:
+        raise NeedMoreData
 
-                    index += 1
+    while True:
+        index = skip_whitespace(input_bytes, index)
+        if index >= input_size:
+            return _end_of_input(supplied_type, complete)
 
+        if input_bytes[index] != 0x3C:  # <
             return supplied_type
 
+        index += 1
+        if index >= input_size:
+            return _end_of_input(supplied_type, complete)
+
+        if _has_prefix(input_bytes, b"!--", index):
+            tag_end = comment_end.search(input_bytes, index + 3)
+        elif input_bytes[index] == 0x21:  # !
+            tag_end = tag_end_pattern.search(input_bytes, index + 1)
+        elif input_bytes[index] == 0x3F:  # ?
+            tag_end = processing_instruction_end.search(input_bytes, index + 1)
+        else:
+            break
+
+        if tag_end is None:
+            return _end_of_input(supplied_type, complete)
+        index = tag_end.end()
+
+    if _has_prefix(input_bytes, b"rss", index):
+        if trace is not None:
+            trace.rule = "feed: rss"
+        return b"application/rss+xml"
+
+    if _has_prefix(input_bytes, b"feed", index):
+        if trace is not None:
+            trace.rule = "feed: feed"
+        return b"application/atom+xml"
+
+    if _has_prefix(input_bytes, b"rdf:RDF", index):
+        namespace = rss_or_rdf_namespace.search(input_bytes, index + 7)
+        if namespace is None:
+            return _end_of_input(supplied_type, complete)
+
+        if rss_1_namespaces[namespace.group()].search(input_bytes, namespace.end()) is None:
+            return _end_of_input(supplied_type, complete)
+
+        if trace is not None:
+            trace.rule = "feed: rdf:RDF"
+        return b"application/rss+xml"
+
+    if not complete:
+        for tag in (b"rss", b"feed", b"rdf:RDF"):
+            if tag.startswith(input_bytes[index:]):
+                raise NeedMoreData
+
     return supplied_type
 
 
-_TOKEN = rb"^\s*[-!#$%&'*+.0-9A-Z^_`a-z{|}~]+\s*$"
+_TOKEN = re.compile(rb"^\s*[-!#$%&'*+.0-9A-Z^_`a-z{|}~]+\s*$")
 
 
 def _is_valid_mime_type(mime_type):
@@ -201,55 +382,777 @@ def _is_valid_mime_type(mime_type):
     if len(parts) < 2:
         return False
     _type, subtype_and_params = parts
-    if not re.match(_TOKEN, _type):
+    if not _TOKEN.match(_type):
         return False
     subtype = subtype_and_params.split(b";", maxsplit=1)[0]
-    if not re.match(_TOKEN, subtype):
+    if not _TOKEN.match(subtype):
         return False
     return True
 
 
+class CacheInfo(NamedTuple):
+    """Statistics of the result cache of a :class:`Sniffer`."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of the lookups that were hits, or 0.0 if there was none."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+_CacheKey = Tuple[bytes, "_SuppliedType", bool]
+_MISSING = object()
+
+
+class _ResultCache:
+    """Thread-safe LRU cache of the results of :meth:`Sniffer.sniff`."""
+
+    __slots__ = ("maxsize", "_digest", "_results", "_lock", "_hits", "_misses")
+
+    def __init__(self, maxsize: int):
+        from hashlib import sha256
+        from threading import Lock
+
+        self.maxsize = maxsize
+        self._digest = sha256
+        self._results: "OrderedDict[_CacheKey, Optional[bytes]]" = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def key(
+        self, resource_header: bytes, supplied_type: "_SuppliedType", no_sniff: bool
+    ) -> _CacheKey:
+        return self._digest(resource_header).digest(), supplied_type, no_sniff
+
+    def get(self, key: _CacheKey) -> object:
+        """Return the result cached for *key*, or :data:`_MISSING`."""
+        with self._lock:
+            result = self._results.get(key, _MISSING)
+            if result is _MISSING:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._results.move_to_end(key)
+            return result
+
+    def put(self, key: _CacheKey, result: Optional[bytes]) -> None:
+        with self._lock:
+            self._results[key] = result
+            if len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self.maxsize, len(self._results))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._results.clear()
+            self._hits = self._misses = 0
+
+
+@lru_cache(maxsize=_ARENA_INDEX_CACHE_SIZE)
+def _arena_index(extra_types: PatternArena) -> PatternIndex:
+    """Return the index of a pattern arena passed as *extra_types* to the
+    functions that sniff a single resource."""
+    return PatternIndex(extra_types)
+
+
+class Sniffer:
+    """Reusable MIME type sniffer.
+
+    A sniffer holds the :func:`extract_mime` options that do not depend on the
+    resource being sniffed, validating and compiling *extra_types* only once,
+    or using them as they are if they are a :class:`PatternArena`.
+    :meth:`sniff` takes the remaining options and returns the same result as
+    :func:`extract_mime`. Sniffing only updates the result cache, under a
+    lock, and the *extra_types* compiled for NumPy, which threads that race
+    to compile them compile identically, so many threads can use a sniffer at
+    once.
+
+    If *cache_size* is not 0, :meth:`sniff` caches up to *cache_size* results,
+    keyed by a digest of the resource header, the supplied MIME type and
+    *no_sniff*, and evicts the least recently used ones.
+    """
+
+    __slots__ = (
+        "http_origin",
+        "extra_types",
+        "supported_types",
+        "_extra_index",
+        "_vectorized_extra_index",
+        "_cache",
+    )
+
+    def __init__(
+        self,
+        *,
+        http_origin: bool = True,
+        extra_types: Optional[Sequence[MimePattern]] = None,
+        supported_types: Optional[Set[bytes]] = None,
+        cache_size: int = 0,
+    ):
+        if cache_size < 0:
+            raise ValueError("cache_size should not be negative")
+        self.http_origin = http_origin
+        self.extra_types = extra_types
+        self.supported_types = supported_types
+        self._extra_index: Union[PatternIndex, PatternList, None] = (
+            PatternIndex(extra_types) if extra_types else None
+        )
+        self._vectorized_extra_index: "Optional[VectorizedPatterns]" = None
+        self._cache = _ResultCache(cache_size) if cache_size else None
+
+    @staticmethod
+    def _uncompiled(
+        *,
+        http_origin: bool = True,
+        extra_types: Optional[Sequence[MimePattern]] = None,
+        supported_types: Optional[Set[bytes]] = None,
+    ) -> "Sniffer":
+        """Return a sniffer for a single resource, which matches
+        *extra_types* without compiling them, unless they are a
+        :class:`PatternArena`, compiled once for all the calls that pass it.
+
+        Sniffers without options are shared, and this is a static method,
+        rather than a class method, so that getting one allocates nothing.
+        """
+        if not extra_types and supported_types is None:
+            return _DEFAULT_SNIFFERS[http_origin]
+        sniffer = Sniffer(http_origin=http_origin, supported_types=supported_types)
+        if extra_types:
+            sniffer.extra_types = extra_types
+            sniffer._extra_index = (
+                _arena_index(extra_types)
+                if isinstance(extra_types, PatternArena)
+                else PatternList(extra_types)
+            )
+        return sniffer
+
+    def sniff(
+        self,
+        body: bytes,
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+        content_encoding: Optional[bytes] = None,
+        trace: Optional[Trace] = None,
+    ) -> Optional[bytes]:
+        if trace is not None:
+            trace._reset()
+            trace._enter("content types")
+        supplied_type = _parse_content_types(content_types)
+        if trace is not None:
+            trace._exit(None)
+        if no_sniff and not supplied_type.is_unknown:
+            if trace is not None:
+                trace.rule = "no_sniff: supplied MIME type"
+            return supplied_type.essence
+        if content_encoding is None:
+            resource_header = _resource_header(body)
+        else:
+            from xtractmime._decoding import decode_header
+
+            if trace is not None:
+                trace._enter("content decoding")
+            resource_header = decode_header(body, content_encoding)
+            if trace is not None:
+                trace._exit(None)
+        if self._cache is None or trace is not None or not self._reads_header(supplied_type):
+            return self._sniff(resource_header, supplied_type, no_sniff, trace=trace)
+
+        key = self._cache.key(resource_header, supplied_type, no_sniff)
+        result = self._cache.get(key)
+        if result is _MISSING:
+            result = self._sniff(resource_header, supplied_type, no_sniff)
+            self._cache.put(key, result)
+        return cast(Optional[bytes], result)
+
+    def _reads_header(self, supplied_type: "_SuppliedType") -> bool:
+        """Return whether :meth:`_sniff` reads the resource header for
+        *supplied_type*, rather than returning its essence."""
+        return (
+            supplied_type.is_unknown
+            or (self.http_origin and supplied_type.is_apache_type)
+            or (
+                not supplied_type.is_xml
+                and (
+                    supplied_type.is_html
+                    or (
+                        bool(self.supported_types)
+                        and (supplied_type.is_image or supplied_type.is_audio_video)
+                    )
+                )
+            )
+        )
+
+    def cache_info(self) -> CacheInfo:
+        """Return the statistics of the result cache of the sniffer."""
+        if self._cache is None:
+            return CacheInfo(0, 0, 0, 0)
+        return self._cache.info()
+
+    def cache_clear(self) -> None:
+        """Clear the result cache of the sniffer and its statistics."""
+        if self._cache is not None:
+            self._cache.clear()
+
+    def sniff_many(
+        self,
+        bodies: Sequence[bytes],
+        *,
+        content_types_list: Optional[Sequence[Optional[Tuple[bytes]]]] = None,
+        no_sniff: bool = False,
+        vectorized: Optional[bool] = None,
+    ) -> List[Optional[bytes]]:
+        """Return the result of :meth:`sniff` for each of *bodies*, with the
+        matching item of *content_types_list* as *content_types*.
+
+        If *vectorized* is ``True``, bodies with an unknown supplied MIME type
+        are matched against all patterns at once with NumPy, which must be
+        installed. If it is ``None``, that is done when NumPy is installed and
+        there are at least :data:`VECTORIZED_MIN_BATCH_SIZE` such bodies.
+        """
+        if content_types_list is None:
+            content_types_list = [None] * len(bodies)
+        elif len(content_types_list) != len(bodies):
+            raise ValueError("content_types_list should have one item per body")
+
+        results: List[Optional[bytes]] = [None] * len(bodies)
+        unknown = []
+        for position, (body, content_types) in enumerate(zip(bodies, content_types_list)):
+            if _parse_content_types(content_types).is_unknown:
+                unknown.append(position)
+            else:
+                results[position] = self.sniff(
+                    body, content_types=content_types, no_sniff=no_sniff
+                )
+
+        if vectorized or (vectorized is None and len(unknown) >= VECTORIZED_MIN_BATCH_SIZE):
+            try:
+                from xtractmime import _vectorized
+            except ImportError:
+                if vectorized:
+                    raise
+            else:
+                if self.extra_types and self._vectorized_extra_index is None:
+                    self._vectorized_extra_index = _vectorized.VectorizedPatterns(self.extra_types)
+                headers = [
+                    _byte_view(bodies[position])[:RESOURCE_HEADER_BUFFER_LENGTH]
+                    for position in unknown
+                ]
+                for position, result in zip(
+                    unknown,
+                    _vectorized.find_unknown_mimetypes(
+                        headers, not no_sniff, self._vectorized_extra_index
+                    ),
+                ):
+                    results[position] = result
+                return results
+
+        for position in unknown:
+            results[position] = self.sniff(
+                bodies[position], content_types=content_types_list[position], no_sniff=no_sniff
+            )
+        return results
+
+    async def sniff_async(
+        self,
+        stream: Union[AsyncReader, AsyncIterable[bytes]],
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Tuple[Optional[bytes], bytes]:
+        """Return the result of :meth:`sniff` for a body read from *stream*,
+        and the bytes read from *stream*.
+
+        *stream* is either an object with a ``read(n)`` coroutine method, such
+        as :class:`asyncio.StreamReader`, from which only the bytes needed to
+        determine the result are read, or an asynchronous iterable of chunks
+        of the body, which is iterated until a chunk determines the result.
+        The returned bytes include every chunk read, whole, so callers can
+        prepend them to the rest of the body.
+        """
+        from inspect import iscoroutinefunction
+
+        sniffer = IncrementalSniffer(content_types=content_types, no_sniff=no_sniff, sniffer=self)
+        chunks: List[bytes] = []
+        if iscoroutinefunction(getattr(stream, "read", None)):
+            reader = cast(AsyncReader, stream)
+            while not sniffer.done:
+                chunk = await reader.read(RESOURCE_HEADER_BUFFER_LENGTH - len(sniffer.header))
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                sniffer.feed(chunk)
+        elif hasattr(stream, "__aiter__"):
+            async for chunk in cast(AsyncIterable[bytes], stream):
+                chunks.append(chunk)
+                sniffer.feed(chunk)
+                if sniffer.done:
+                    break
+        else:
+            raise TypeError(
+                f"stream must have a read() coroutine method or be an asynchronous iterable, "
+                f"got {type(stream).__name__}"
+            )
+        return sniffer.close(), b"".join(chunks)
+
+    def sniff_file(
+        self,
+        file: BinaryIO,
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Optional[bytes]:
+        """Return the result of :meth:`sniff` for the body read from the
+        current position of the binary *file*, reading at most
+        :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes from it."""
+        if no_sniff and not _parse_content_types(content_types).is_unknown:
+            return self.sniff(b"", content_types=content_types, no_sniff=no_sniff)
+        return self.sniff(_read_header(file), content_types=content_types, no_sniff=no_sniff)
+
+    def sniff_path(
+        self,
+        path: "Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]",
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Optional[bytes]:
+        """Return the result of :meth:`sniff` for the contents of the file at
+        *path*, reading at most :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes
+        from it."""
+        with open(path, "rb", buffering=0) as file:
+            return self.sniff_file(file, content_types=content_types, no_sniff=no_sniff)
+
+    def classify(
+        self,
+        body: bytes,
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Classification:
+        """Return every signature that matches *body*, with their group, and
+        the result of :meth:`sniff`.
+
+        All signatures, including font signatures, which :meth:`sniff` never
+        matches, are dispatched on the resource header at once. If the
+        supplied MIME type is unknown, the result of :meth:`sniff` is the
+        first candidate that it would match.
+        """
+        supplied_type = _parse_content_types(content_types)
+        resource_header = _byte_view(body)[:RESOURCE_HEADER_BUFFER_LENGTH]
+        signatures = find_signatures(resource_header)
+        if self._extra_index:
+            extra_types = self._extra_index.patterns
+            position = sum(1 for group, _ in signatures if group in ("text", "extra"))
+            signatures[position:position] = [
+                ("extra_types", extra_types[order][3])
+                for order in self._extra_index.find_all(resource_header)
+            ]
+        candidates = tuple(MimeCandidate(group, mime_type) for group, mime_type in signatures)
+
+        if not supplied_type.is_unknown:
+            mime_type = self._sniff(resource_header, supplied_type, no_sniff)
+            return Classification(mime_type, candidates)
+        for candidate in candidates:
+            if candidate.group != "font" and (candidate.group != "text" or not no_sniff):
+                return Classification(candidate.mime_type, candidates)
+        mime_type = (
+            b"application/octet-stream" if is_binary_data(resource_header) else b"text/plain"
+        )
+        return Classification(mime_type, candidates)
+
+    def _sniff(
+        self,
+        resource_header: bytes,
+        supplied_type: "_SuppliedType",
+        no_sniff: bool,
+        complete: bool = True,
+        trace: Optional[Trace] = None,
+    ) -> Optional[bytes]:
+        if supplied_type.is_unknown:
+            return self._find_unknown_mimetype(resource_header, not no_sniff, complete, trace)
+
+        if no_sniff:
+            if trace is not None:
+                trace.rule = "no_sniff: supplied MIME type"
+            return supplied_type.essence
+
+        if self.http_origin and supplied_type.is_apache_type:
+            if trace is not None:
+                trace._enter("apache binary check")
+            matched_type = _sniff_mislabled_binary(resource_header, complete)
+            if trace is not None:
+                trace._exit(True, _apache_rule, resource_header)
+            return matched_type
+
+        if supplied_type.is_xml:
+            if trace is not None:
+                trace.rule = "supplied XML MIME type"
+            return supplied_type.essence
+
+        if supplied_type.is_html:
+            if trace is not None:
+                trace._enter("feed check")
+                trace.rule = "feed: not a feed"
+            matched_type = _sniff_mislabled_feed(
+                resource_header, supplied_type.essence, complete, trace
+            )
+            if trace is not None:
+                trace._exit(None)
+            return matched_type
+
+        if self.supported_types:
+            if supplied_type.is_image:
+                if trace is not None:
+                    trace._enter("image patterns")
+                matched_type = get_image_mime(resource_header, complete)
+                matched = matched_type in self.supported_types
+                if trace is not None:
+                    trace._exit(
+                        matched,
+                        _pattern_rule,
+                        "IMAGE_PATTERNS",
+                        pattern_index("IMAGE_INDEX"),
+                        resource_header,
+                    )
+                if matched:
+                    return matched_type
+
+            if supplied_type.is_audio_video:
+                if trace is not None:
+                    trace._enter("audio/video signatures")
+                matched_type = get_audio_video_mime(resource_header, complete)
+                matched = matched_type in self.supported_types
+                if trace is not None:
+                    trace._exit(matched, _audio_video_rule, resource_header)
+                if matched:
+                    return matched_type
+
+        if trace is not None:
+            trace.rule = "supplied MIME type"
+        return supplied_type.essence
+
+    def _find_unknown_mimetype(
+        self,
+        input_bytes: bytes,
+        sniff_scriptable: bool,
+        complete: bool = True,
+        trace: Optional[Trace] = None,
+    ) -> Optional[bytes]:
+        if sniff_scriptable:
+            if trace is not None:
+                trace._enter("text patterns")
+            matched_type = get_text_mime(input_bytes, complete)
+            if trace is not None:
+                trace._exit(
+                    matched_type,
+                    _pattern_rule,
+                    "TEXT_PATTERNS",
+                    pattern_index("TEXT_INDEX"),
+                    input_bytes,
+                )
+            if matched_type:
+                return matched_type
+
+        if trace is not None:
+            trace._enter("extra patterns")
+        matched_type = pattern_index("EXTRA_INDEX").match(input_bytes, complete)
+        if trace is not None:
+            trace._exit(
+                matched_type,
+                _pattern_rule,
+                "EXTRA_PATTERNS",
+                pattern_index("EXTRA_INDEX"),
+                input_bytes,
+            )
+        if matched_type:
+            return matched_type
+
+        if self._extra_index:
+            if trace is not None:
+                trace._enter("extra_types")
+            matched_type = self._extra_index.match(input_bytes, complete)
+            if trace is not None:
+                trace._exit(
+                    matched_type, _pattern_rule, "extra_types", self._extra_index, input_bytes
+                )
+            if matched_type:
+                return matched_type
+
+        if trace is not None:
+            trace._enter("image patterns")
+        matched_type = get_image_mime(input_bytes, complete)
+        if trace is not None:
+            trace._exit(
+                matched_type,
+                _pattern_rule,
+                "IMAGE_PATTERNS",
+                pattern_index("IMAGE_INDEX"),
+                input_bytes,
+            )
+        if matched_type:
+            return matched_type
+
+        if trace is not None:
+            trace._enter("audio/video signatures")
+        matched_type = get_audio_video_mime(input_bytes, complete)
+        if trace is not None:
+            trace._exit(matched_type, _audio_video_rule, input_bytes)
+        if matched_type:
+            return matched_type
+
+        if trace is not None:
+            trace._enter("archive patterns")
+        matched_type = get_archive_mime(input_bytes, complete)
+        if trace is not None:
+            trace._exit(
+                matched_type,
+                _pattern_rule,
+                "ARCHIVE_PATTERNS",
+                pattern_index("ARCHIVE_INDEX"),
+                input_bytes,
+            )
+        if matched_type:
+            return matched_type
+
+        if trace is not None:
+            trace._enter("binary check")
+        matched_type = (
+            b"application/octet-stream"
+            if is_binary_data(input_bytes)
+            else _end_of_input(b"text/plain", complete)
+        )
+        if trace is not None:
+            trace._exit(True, _binary_rule, "binary check", input_bytes)
+        return matched_type
+
+
+class IncrementalSniffer:
+    """Sniffer for a resource whose body is received in chunks.
+
+    Pass chunks of the body to :meth:`feed` as they are received.
+    :attr:`result` is set as soon as the bytes received are enough to know
+    the result of :func:`extract_mime` for the whole body, which happens at
+    the latest once :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes have been
+    received. Call :meth:`close` if the body ends before that.
+    :attr:`header` holds the bytes used for sniffing received so far.
+
+    *sniffer* is the :class:`Sniffer` whose options to use, by default one
+    with the default options of :func:`extract_mime`.
+    """
+
+    def __init__(
+        self,
+        *,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+        sniffer: Optional[Sniffer] = None,
+    ):
+        self._sniffer = sniffer or Sniffer()
+        self._supplied_type = _parse_content_types(content_types)
+        self._no_sniff = no_sniff
+        self.header = b""
+        self.done = False
+        self.result: Optional[bytes] = None
+        self._decide(complete=False)
+
+    def feed(self, chunk: bytes) -> Optional[bytes]:
+        """Process the next chunk of the body, and return :attr:`result`."""
+        if not self.done:
+            self.header += bytes(chunk[: RESOURCE_HEADER_BUFFER_LENGTH - len(self.header)])
+            self._decide(complete=len(self.header) >= RESOURCE_HEADER_BUFFER_LENGTH)
+        return self.result
+
+    def close(self) -> Optional[bytes]:
+        """Signal the end of the body, and return :attr:`result`."""
+        if not self.done:
+            self._decide(complete=True)
+        return self.result
+
+    def _decide(self, complete: bool) -> None:
+        try:
+            self.result = self._sniffer._sniff(
+                self.header, self._supplied_type, self._no_sniff, complete
+            )
+        except NeedMoreData:
+            return
+        self.done = True
+
+
+class _SuppliedType(NamedTuple):
+    """Supplied MIME type, parsed once for every time it is supplied."""
+
+    #: MIME type essence, or ``b""`` if the supplied MIME type is not valid.
+    essence: bytes
+    #: Whether Apache may have set the supplied MIME type on binary resources.
+    is_apache_type: bool
+    is_unknown: bool
+    is_xml: bool
+    is_html: bool
+    is_image: bool
+    is_audio_video: bool
+
+
+_APACHE_TYPE_SET = frozenset(_APACHE_TYPES)
+_UNKNOWN_TYPES = frozenset((b"", b"unknown/unknown", b"application/unknown", b"*/*"))
+
+#: Maximum number of distinct supplied MIME types whose parsing is cached.
+_SUPPLIED_TYPE_CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=_SUPPLIED_TYPE_CACHE_SIZE)
+def _parse_supplied_type(supplied_type: bytes) -> _SuppliedType:
+    is_apache_type = supplied_type in _APACHE_TYPE_SET
+    if not _is_valid_mime_type(supplied_type):
+        supplied_type = b""
+    essence = supplied_type.split(b";")[0].strip().lower()
+    return _SuppliedType(
+        essence=essence,
+        is_apache_type=is_apache_type,
+        is_unknown=essence in _UNKNOWN_TYPES,
+        is_xml=is_xml_mime_type(essence),
+        is_html=is_html_mime_type(essence),
+        is_image=is_image_mime_type(essence),
+        is_audio_video=is_audio_video_mime_type(essence),
+    )
+
+
+# Sniffers without options, shared by the functions that sniff a single
+# resource so that they do not create one per call.
+_DEFAULT_SNIFFERS = {
+    http_origin: Sniffer(http_origin=http_origin) for http_origin in (False, True)
+}
+
+
+def _parse_content_types(content_types: Optional[Tuple[bytes]]) -> _SuppliedType:
+    supplied_type = content_types[-1] if content_types else b""
+    if type(supplied_type) is not bytes:
+        supplied_type = bytes(supplied_type)
+    return _parse_supplied_type(supplied_type)
+
+
 def extract_mime(
     body: bytes,
     *,
     content_types: Optional[Tuple[bytes]] = None,
     http_origin: bool = True,
     no_sniff: bool = False,
-    extra_types: Optional[Tuple[Tuple[bytes, bytes, Optional[Set[bytes]], bytes], ...]] = None,
+    extra_types: Optional[Sequence[MimePattern]] = None,
     supported_types: Optional[Set[bytes]] = None,
+    content_encoding: Optional[bytes] = None,
+    trace: Optional[Trace] = None,
 ) -> Optional[bytes]:
-    extra_types = extra_types or tuple()
-    supplied_type = content_types[-1] if content_types else b""
-    check_for_apache = http_origin and supplied_type in _APACHE_TYPES
-    if not _is_valid_mime_type(supplied_type):
-        supplied_type = b""
-    supplied_type = supplied_type.split(b";")[0].strip().lower()
-    resource_header = memoryview(body)[:RESOURCE_HEADER_BUFFER_LENGTH]
-
-    if supplied_type in (b"", b"unknown/unknown", b"application/unknown", b"*/*"):
-        return _find_unknown_mimetype(resource_header, not no_sniff, extra_types)
-
-    if no_sniff:
-        return supplied_type
+    sniffer = Sniffer._uncompiled(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    return sniffer.sniff(
+        body,
+        content_types=content_types,
+        no_sniff=no_sniff,
+        content_encoding=content_encoding,
+        trace=trace,
+    )
+
+
+async def extract_mime_async(
+    stream: Union[AsyncReader, AsyncIterable[bytes]],
+    *,
+    content_types: Optional[Tuple[bytes]] = None,
+    http_origin: bool = True,
+    no_sniff: bool = False,
+    extra_types: Optional[Sequence[MimePattern]] = None,
+    supported_types: Optional[Set[bytes]] = None,
+) -> Tuple[Optional[bytes], bytes]:
+    sniffer = Sniffer._uncompiled(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    return await sniffer.sniff_async(stream, content_types=content_types, no_sniff=no_sniff)
 
-    if check_for_apache:
-        return _sniff_mislabled_binary(resource_header)
 
-    if supplied_type.endswith(b"+xml") or supplied_type in {b"text/xml", b"application/xml"}:
-        return supplied_type
+def extract_mime_from_file(
+    file: BinaryIO,
+    *,
+    content_types: Optional[Tuple[bytes]] = None,
+    http_origin: bool = True,
+    no_sniff: bool = False,
+    extra_types: Optional[Sequence[MimePattern]] = None,
+    supported_types: Optional[Set[bytes]] = None,
+) -> Optional[bytes]:
+    sniffer = Sniffer._uncompiled(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    return sniffer.sniff_file(file, content_types=content_types, no_sniff=no_sniff)
 
-    if is_html_mime_type(supplied_type):
-        return _sniff_mislabled_feed(resource_header, supplied_type)
 
-    if supported_types:
-        if is_image_mime_type(supplied_type):
-            matched_type = get_image_mime(resource_header)
-            if matched_type in supported_types:
-                return matched_type
+def extract_mime_from_path(
+    path: "Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]",
+    *,
+    content_types: Optional[Tuple[bytes]] = None,
+    http_origin: bool = True,
+    no_sniff: bool = False,
+    extra_types: Optional[Sequence[MimePattern]] = None,
+    supported_types: Optional[Set[bytes]] = None,
+) -> Optional[bytes]:
+    sniffer = Sniffer._uncompiled(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    return sniffer.sniff_path(path, content_types=content_types, no_sniff=no_sniff)
 
-        if is_audio_video_mime_type(supplied_type):
-            matched_type = get_audio_video_mime(resource_header)
-            if matched_type in supported_types:
-                return matched_type
 
-    return supplied_type
+def extract_mime_many(
+    bodies: Sequence[bytes],
+    content_types_list: Optional[Sequence[Optional[Tuple[bytes]]]] = None,
+    *,
+    http_origin: bool = True,
+    no_sniff: bool = False,
+    extra_types: Optional[Sequence[MimePattern]] = None,
+    supported_types: Optional[Set[bytes]] = None,
+    executor: "Optional[Executor]" = None,
+    chunk_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+) -> List[Optional[bytes]]:
+    if content_types_list is None:
+        content_types_list = [None] * len(bodies)
+    elif len(content_types_list) != len(bodies):
+        raise ValueError("content_types_list should have one item per body")
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("chunk_size should be at least 1")
+    if max_workers is not None and max_workers < 1:
+        raise ValueError("max_workers should be at least 1")
+    sniffer = Sniffer(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    if executor is None:
+        return sniffer.sniff_many(bodies, content_types_list=content_types_list, no_sniff=no_sniff)
+    from xtractmime._batch import default_chunk_size, sniff_many
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = default_chunk_size(len(bodies), max_workers)
+    return sniff_many(
+        sniffer, bodies, content_types_list, no_sniff, executor, chunk_size, max_workers
+    )
+
+
+def classify_mime(
+    body: bytes,
+    *,
+    content_types: Optional[Tuple[bytes]] = None,
+    http_origin: bool = True,
+    no_sniff: bool = False,
+    extra_types: Optional[Sequence[MimePattern]] = None,
+    supported_types: Optional[Set[bytes]] = None,
+) -> Classification:
+    sniffer = Sniffer._uncompiled(
+        http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+    )
+    return sniffer.classify(body, content_types=content_types, no_sniff=no_sniff)
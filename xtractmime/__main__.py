@@ -0,0 +1,169 @@
+"""Sniff the MIME types of files and print them as JSON lines.
+
+Run ``python -m xtractmime --help`` for usage.
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from xtractmime import Sniffer
+from xtractmime._batch import map_chunks
+
+_Task = Tuple[str, Optional[str]]
+
+_sniffer: Optional[Sniffer] = None
+
+
+def _init_worker(http_origin: bool) -> None:
+    global _sniffer
+    _sniffer = Sniffer(http_origin=http_origin)
+
+
+def _sniff_chunk(tasks: List[_Task], no_sniff: bool) -> List[dict]:
+    if _sniffer is None:
+        raise RuntimeError("the worker sniffer was not initialized")
+    records = []
+    for path, supplied_type in tasks:
+        record: dict = {"path": path}
+        content_types = None
+        if supplied_type is not None:
+            record["supplied_type"] = supplied_type
+            content_types = (supplied_type.encode("utf-8", "surrogateescape"),)
+        try:
+            result = _sniffer.sniff_path(path, content_types=content_types, no_sniff=no_sniff)
+        except OSError as error:
+            record["error"] = error.strerror or str(error)
+        else:
+            record["result"] = (
+                None if result is None else result.decode("utf-8", "surrogateescape")
+            )
+        records.append(record)
+    return records
+
+
+def _walk(path: str, supplied_type: Optional[str]) -> Iterator[_Task]:
+    if not os.path.isdir(path):
+        yield path, supplied_type
+        return
+    for root, directories, files in os.walk(path):
+        directories.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name), supplied_type
+
+
+def _iter_tasks(
+    paths: Sequence[str], supplied_type: Optional[str], stdin: TextIO
+) -> Iterator[_Task]:
+    for path in paths or ["-"]:
+        if path != "-":
+            yield from _walk(path, supplied_type)
+            continue
+        for line in stdin:
+            line = line.rstrip("\r\n")
+            if line:
+                line_path, _, line_type = line.partition("\t")
+                yield from _walk(line_path, line_type or supplied_type)
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m xtractmime",
+        description=(
+            "Sniff the MIME type of files, reading only the first bytes of each, and print one "
+            "JSON object per file with its path and result."
+        ),
+    )
+    parser.add_argument(
+        "paths",
+        nargs="*",
+        metavar="PATH",
+        help=(
+            "file or directory to sniff recursively; '-' (the default) reads paths from standard "
+            "input, one per line, optionally followed by a tab and the supplied MIME type"
+        ),
+    )
+    parser.add_argument(
+        "-t", "--content-type", help="supplied MIME type of files without one, e.g. text/plain"
+    )
+    parser.add_argument(
+        "--no-sniff",
+        action="store_true",
+        help="return the supplied MIME type, as for X-Content-Type-Options: nosniff",
+    )
+    parser.add_argument(
+        "--no-http-origin",
+        dest="http_origin",
+        action="store_false",
+        help="the files were not retrieved over HTTP",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of workers (default: number of CPUs); 1 sniffs in the main process",
+    )
+    parser.add_argument(
+        "--executor",
+        choices=("process", "thread"),
+        default="process",
+        help="kind of workers (default: process)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=64,
+        help="number of files sent to a worker at once (default: 64)",
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    return args
+
+
+def _write_records(records: Iterable[dict]) -> int:
+    """Write *records* to standard output as JSON lines, and return the exit
+    status."""
+    status = 0
+    try:
+        for record in records:
+            if "error" in record:
+                status = 1
+            sys.stdout.write(json.dumps(record) + "\n")
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader of the output exited, e.g. head; silence the error that
+        # flushing standard output at exit would raise.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        status = 1
+    return status
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = _parse_args(argv)
+    tasks = _iter_tasks(args.paths, args.content_type, sys.stdin)
+    sniff_chunk = partial(_sniff_chunk, no_sniff=args.no_sniff)
+
+    if args.jobs == 1:
+        _init_worker(args.http_origin)
+        return _write_records(record for task in tasks for record in sniff_chunk([task]))
+
+    executor_class = ProcessPoolExecutor if args.executor == "process" else ThreadPoolExecutor
+    with executor_class(
+        max_workers=args.jobs, initializer=_init_worker, initargs=(args.http_origin,)
+    ) as executor:
+        return _write_records(
+            map_chunks(
+                partial(executor.submit, sniff_chunk), tasks, args.chunk_size, 2 * args.jobs
+            )
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+"""Sniffing of many bodies with an executor."""
+import itertools
+import os
+import sys
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from threading import Lock
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH, Sniffer, _byte_view
+from xtractmime._utils import MimePattern
+
+try:
+    from multiprocessing import resource_tracker, shared_memory  # type: ignore
+except ImportError:  # Python 3.7
+    shared_memory = None  # type: ignore
+
+_Task = TypeVar("_Task")
+_Result = TypeVar("_Result")
+
+_ContentTypes = Optional[Tuple[bytes]]
+_Options = Tuple[bool, Optional[Sequence[MimePattern]], Optional[Set[bytes]]]
+
+#: Number of sniffers, one per call of :func:`sniff_many`, that a worker
+#: process keeps compiled.
+_WORKER_SNIFFERS = 8
+#: Bounds of the default number of bodies per chunk: chunks must be large
+#: enough to amortize submitting them, and small enough for every worker to
+#: get several of them.
+_MIN_CHUNK_SIZE = 64
+_MAX_CHUNK_SIZE = 1024
+_CHUNKS_PER_WORKER = 4
+
+_calls = itertools.count()
+# itertools.count is not thread-safe on free-threaded builds.
+_calls_lock = Lock()
+_worker_sniffers: "OrderedDict[str, Sniffer]" = OrderedDict()
+#: Whether each worker process shares the resource tracker of its parent.
+_shares_resource_tracker: Dict[int, bool] = {}
+
+
+def map_chunks(
+    submit: Callable[[List[_Task]], "Future[List[_Result]]"],
+    tasks: Iterable[_Task],
+    chunk_size: int,
+    max_pending: int,
+) -> Iterator[_Result]:
+    """Yield the results of *tasks* in order, submitting them in chunks of
+    *chunk_size* with at most *max_pending* chunks in flight."""
+    pending: Deque["Future[List[_Result]]"] = deque()
+    chunk: List[_Task] = []
+    for task in tasks:
+        chunk.append(task)
+        if len(chunk) < chunk_size:
+            continue
+        pending.append(submit(chunk))
+        chunk = []
+        if len(pending) >= max_pending:
+            yield from pending.popleft().result()
+    if chunk:
+        pending.append(submit(chunk))
+    while pending:
+        yield from pending.popleft().result()
+
+
+def default_chunk_size(count: int, max_workers: int) -> int:
+    """Return the number of bodies per chunk with which to sniff *count*
+    bodies with *max_workers* workers."""
+    chunk_size = -(-count // (max_workers * _CHUNKS_PER_WORKER))
+    return min(max(chunk_size, _MIN_CHUNK_SIZE), _MAX_CHUNK_SIZE)
+
+
+def _worker_sniffer(call: str, options: _Options) -> Sniffer:
+    """Return the sniffer of the call *call* of :func:`sniff_many`, compiling
+    it only for the first chunk of the call that the worker sniffs."""
+    sniffer = _worker_sniffers.get(call)
+    if sniffer is None:
+        http_origin, extra_types, supported_types = options
+        sniffer = Sniffer(
+            http_origin=http_origin, extra_types=extra_types, supported_types=supported_types
+        )
+        _worker_sniffers[call] = sniffer
+        if len(_worker_sniffers) > _WORKER_SNIFFERS:
+            _worker_sniffers.popitem(last=False)
+    return sniffer
+
+
+def _has_resource_tracker() -> bool:
+    """Return whether the process already has a resource tracker, inherited
+    from its parent or started by an earlier registration.
+
+    This is a workaround for Python 3.8 to 3.12, whose shared memory cannot be
+    attached without tracking it: it reads the ``_fd`` attribute of the
+    private tracker of :mod:`multiprocessing.resource_tracker`, which is
+    ``None`` until the tracker is started or inherited, in all of those
+    versions of CPython.
+    """
+    tracker = resource_tracker._resource_tracker  # type: ignore
+    return getattr(tracker, "_fd", None) is not None
+
+
+def _attach(name: str) -> "shared_memory.SharedMemory":
+    """Return the shared memory block *name*, created by the parent process,
+    which also unlinks it.
+
+    Before Python 3.13, attaching to a block registers it with the resource
+    tracker of the process, which unlinks it and warns about a leak when the
+    process exits. That registration is undone, unless the worker shares the
+    resource tracker of its parent, e.g. because it was spawned, in which case
+    it is the registration of the parent.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    pid = os.getpid()
+    if pid not in _shares_resource_tracker:
+        _shares_resource_tracker[pid] = _has_resource_tracker()
+    block = shared_memory.SharedMemory(name=name)
+    if os.name == "posix" and not _shares_resource_tracker[pid]:
+        resource_tracker.unregister(block._name, "shared_memory")  # type: ignore
+    return block
+
+
+def _sniff_shared_chunk(
+    call: str,
+    options: _Options,
+    name: str,
+    ends: List[int],
+    content_types_list: List[_ContentTypes],
+    no_sniff: bool,
+) -> List[Optional[bytes]]:
+    sniffer = _worker_sniffer(call, options)
+    block = _attach(name)
+    try:
+        headers = [block.buf[start:end] for start, end in zip([0, *ends], ends)]
+        try:
+            return sniffer.sniff_many(
+                headers, content_types_list=content_types_list, no_sniff=no_sniff
+            )
+        finally:
+            for header in headers:
+                header.release()
+    finally:
+        block.close()
+
+
+def _sniff_pickled_chunk(
+    call: str,
+    options: _Options,
+    headers: List[bytes],
+    content_types_list: List[_ContentTypes],
+    no_sniff: bool,
+) -> List[Optional[bytes]]:
+    sniffer = _worker_sniffer(call, options)
+    return sniffer.sniff_many(headers, content_types_list=content_types_list, no_sniff=no_sniff)
+
+
+def _sniff_chunk(
+    sniffer: Sniffer,
+    headers: List[memoryview],
+    content_types_list: List[_ContentTypes],
+    no_sniff: bool,
+) -> List[Optional[bytes]]:
+    return sniffer.sniff_many(headers, content_types_list=content_types_list, no_sniff=no_sniff)
+
+
+def _release_shared_memory(block: "shared_memory.SharedMemory") -> None:
+    block.close()
+    block.unlink()
+
+
+def sniff_many(
+    sniffer: Sniffer,
+    bodies: Sequence[bytes],
+    content_types_list: Sequence[_ContentTypes],
+    no_sniff: bool,
+    executor: Executor,
+    chunk_size: int,
+    max_workers: int,
+) -> List[Optional[bytes]]:
+    """Return the result of :meth:`Sniffer.sniff_many` for *bodies*, sniffing
+    chunks of *chunk_size* bodies with *executor*, which has *max_workers*
+    workers, with at most two chunks per worker in flight.
+
+    Only the first :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes of each body
+    are sent to the workers. Unless *executor* is a thread pool, they are
+    copied into a shared memory block per chunk, which the workers read
+    without unpickling them.
+    """
+    options: _Options = (sniffer.http_origin, sniffer.extra_types, sniffer.supported_types)
+    with _calls_lock:
+        call = f"{os.getpid()}-{next(_calls)}"
+    in_process = isinstance(executor, ThreadPoolExecutor)
+
+    def submit(chunk: List[Tuple[bytes, _ContentTypes]]) -> "Future[List[Optional[bytes]]]":
+        headers = [_byte_view(body)[:RESOURCE_HEADER_BUFFER_LENGTH] for body, _ in chunk]
+        chunk_content_types = [content_types for _, content_types in chunk]
+        if in_process:
+            return executor.submit(_sniff_chunk, sniffer, headers, chunk_content_types, no_sniff)
+        if shared_memory is None:
+            return executor.submit(
+                _sniff_pickled_chunk,
+                call,
+                options,
+                [bytes(header) for header in headers],
+                chunk_content_types,
+                no_sniff,
+            )
+
+        ends = list(itertools.accumulate(len(header) for header in headers))
+        block = shared_memory.SharedMemory(create=True, size=max(ends[-1], 1))
+        try:
+            for start, end, header in zip([0, *ends], ends, headers):
+                block.buf[start:end] = header
+            future = executor.submit(
+                _sniff_shared_chunk, call, options, block.name, ends, chunk_content_types, no_sniff
+            )
+        except BaseException:
+            _release_shared_memory(block)
+            raise
+        future.add_done_callback(lambda _: _release_shared_memory(block))
+        return future
+
+    return list(
+        map_chunks(
+            submit,
+            zip(bodies, content_types_list),
+            chunk_size,
+            2 * max_workers,
+        )
+    )
@@ -0,0 +1,90 @@
+"""Decoding of the resource header of content-encoded bodies."""
+import bz2
+import lzma
+import zlib
+from typing import Callable, Dict
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH, _byte_view
+
+try:
+    from typing import Protocol
+except ImportError:  # Python 3.7
+    Protocol = object  # type: ignore
+
+#: Number of encoded bytes passed to a decompressor at once, so that bz2 and
+#: LZMA decompressors do not copy the rest of a large body.
+_INPUT_CHUNK_SIZE = 4096
+
+
+class _Decompressor(Protocol):
+    """Decompressor whose output can be bounded, such as
+    :class:`bz2.BZ2Decompressor`."""
+
+    @property
+    def eof(self) -> bool:
+        ...
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        ...
+
+
+def _gzip_decompressor(data: memoryview) -> _Decompressor:
+    return zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+def _deflate_decompressor(data: memoryview) -> _Decompressor:
+    """Return a decompressor for zlib data, or for raw deflate data, which
+    some servers send instead."""
+    if len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0:
+        return zlib.decompressobj(zlib.MAX_WBITS)
+    return zlib.decompressobj(-zlib.MAX_WBITS)
+
+
+_DECOMPRESSORS: Dict[bytes, Callable[[memoryview], _Decompressor]] = {
+    b"gzip": _gzip_decompressor,
+    b"x-gzip": _gzip_decompressor,
+    b"deflate": _deflate_decompressor,
+    b"bzip2": lambda data: bz2.BZ2Decompressor(),
+    b"x-bzip2": lambda data: bz2.BZ2Decompressor(),
+    b"xz": lambda data: lzma.LZMADecompressor(),
+    b"lzma": lambda data: lzma.LZMADecompressor(),
+}
+
+#: Content codings that leave the body unchanged.
+_IDENTITY = frozenset((b"", b"identity"))
+
+
+def decode_header(body: bytes, content_encoding: bytes) -> bytes:
+    """Return the first :data:`RESOURCE_HEADER_BUFFER_LENGTH` bytes of *body*
+    decoded as per *content_encoding*, the value of a ``Content-Encoding``
+    header, decompressing only the encoded bytes needed to produce them.
+
+    A truncated *body* is decoded as far as it goes. A :exc:`ValueError` is
+    raised if *content_encoding* is not supported, or if *body* is not
+    validly encoded.
+    """
+    codings = [
+        coding
+        for coding in content_encoding.lower().split(b",")
+        if coding.strip() not in _IDENTITY
+    ]
+    data = _byte_view(body)
+    if not codings:
+        return data[:RESOURCE_HEADER_BUFFER_LENGTH]
+    coding = codings[0].strip()
+    if len(codings) > 1 or coding not in _DECOMPRESSORS:
+        raise ValueError(f"unsupported content encoding: {content_encoding!r}")
+
+    decompressor = _DECOMPRESSORS[coding](data)
+    header = bytearray()
+    try:
+        for start in range(0, len(data), _INPUT_CHUNK_SIZE):
+            header += decompressor.decompress(
+                data[start : start + _INPUT_CHUNK_SIZE],
+                RESOURCE_HEADER_BUFFER_LENGTH - len(header),
+            )
+            if len(header) >= RESOURCE_HEADER_BUFFER_LENGTH or decompressor.eof:
+                break
+    except (EOFError, OSError, lzma.LZMAError, zlib.error) as error:
+        raise ValueError(f"invalid {coding.decode()} content: {error}") from error
+    return bytes(header)
@@ -1,5 +1,21 @@
-from struct import unpack
-from typing import Optional, Set, Tuple
+from array import array
+from functools import lru_cache
+from itertools import chain
+from struct import unpack_from
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    overload,
+)
 
 from xtractmime._patterns import (
     ARCHIVE_PATTERNS,
@@ -8,8 +24,11 @@ from xtractmime._patterns import (
     FONT_PATTERNS,
     IMAGE_PATTERNS,
     TEXT_PATTERNS,
+    WHITESPACE_BYTES,
 )
 
+MimePattern = Tuple[bytes, bytes, Optional[Set[bytes]], bytes]
+
 SAMPLE_RATES = (44100, 48000, 32000)
 MP25_RATES = (
     0,
@@ -47,6 +66,18 @@ MP3_RATES = (
 )
 
 
+#: Single-byte :class:`bytes` objects by value, to look up a byte of any
+#: buffer in a set of bytes without creating a new object.
+_BYTES = tuple(bytes((value,)) for value in range(256))
+
+_WEBM_MAGIC = b"\x1a\x45\xdf\xa3"
+
+
+class NeedMoreData(Exception):
+    """Raised when matching a truncated input whose result could still change
+    once more bytes are available."""
+
+
 def is_match_mime_pattern(
     input_bytes: bytes, byte_pattern: bytes, pattern_mask: bytes, lstrip: Set[bytes] = None
 ) -> bool:
@@ -60,20 +91,488 @@ def is_match_mime_pattern(
     if input_size < pattern_size:
         return False
 
-    input_index, pattern_index = 0, 0
+    input_index = 0
 
     if lstrip:
-        while input_index < input_size and input_bytes[input_index : input_index + 1] in lstrip:
+        while input_index < input_size and _BYTES[input_bytes[input_index]] in lstrip:
             input_index += 1
 
-    while pattern_index < pattern_size:
-        masked_byte = bytes([input_bytes[input_index] & pattern_mask[pattern_index]])
-        if masked_byte != byte_pattern[pattern_index : pattern_index + 1]:
+    return _match_at(
+        input_bytes,
+        input_index,
+        byte_pattern,
+        pattern_mask,
+        _compile_mask(byte_pattern, pattern_mask),
+    )
+
+
+class PatternArena(Sequence[MimePattern]):
+    """Patterns packed into a single :class:`bytes` arena.
+
+    The arena holds the bytes of each pattern, followed by its mask unless
+    every byte of the mask is ``ff``. Arrays hold the offset and the length of
+    each pattern, and its position in tuples of the distinct sets of leading
+    bytes, MIME types and other masks as big-endian integers, so that the
+    patterns cost a few Python objects however many they are.
+
+    A pattern arena is a sequence of the patterns it was built from, whose
+    items are rebuilt on access, and it is not modified once built.
+    """
+
+    def __init__(self, patterns: Iterable[MimePattern]):
+        arena = bytearray()
+        self._starts = array("I")
+        self._sizes = array("I")
+        self._mask_ids = array("i")
+        self._strip_ids = array("I")
+        self._type_ids = array("I")
+        strips: Dict[Optional[FrozenSet[bytes]], int] = {}
+        mime_types: Dict[bytes, int] = {}
+        masks: Dict[int, int] = {}
+
+        for byte_pattern, pattern_mask, lstrip, mime_type in patterns:
+            if len(byte_pattern) != len(pattern_mask):
+                raise ValueError("pattern's length should match mask's length")
+
+            self._starts.append(len(arena))
+            self._sizes.append(len(byte_pattern))
+            arena += byte_pattern
+            if pattern_mask.count(0xFF) == len(pattern_mask):
+                self._mask_ids.append(-1)
+            else:
+                mask = int.from_bytes(pattern_mask, "big")
+                self._mask_ids.append(masks.setdefault(mask, len(masks)))
+                arena += pattern_mask
+            strip = frozenset(byte for byte in lstrip or () if len(byte) == 1) or None
+            self._strip_ids.append(strips.setdefault(strip, len(strips)))
+            self._type_ids.append(mime_types.setdefault(mime_type, len(mime_types)))
+
+        self._arena = bytes(arena)
+        self._strips = tuple(strips)
+        self._mime_types = tuple(mime_types)
+        self._masks = tuple(masks)
+        self._columns = (
+            self._arena,
+            self._starts,
+            self._sizes,
+            self._mask_ids,
+            self._masks,
+            self._strip_ids,
+        )
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @overload
+    def __getitem__(self, order: int) -> MimePattern:
+        ...
+
+    @overload
+    def __getitem__(self, order: slice) -> Tuple[MimePattern, ...]:  # noqa: F811
+        ...
+
+    def __getitem__(  # noqa: F811
+        self, order: Union[int, slice]
+    ) -> Union[MimePattern, Tuple[MimePattern, ...]]:
+        if isinstance(order, slice):
+            return tuple(self[i] for i in range(*order.indices(len(self))))
+        start = self._starts[order]
+        size = self._sizes[order]
+        end = start + size
+        strip = self._strips[self._strip_ids[order]]
+        return (
+            self._arena[start:end],
+            b"\xff" * size if self._mask_ids[order] < 0 else self._arena[end : end + size],
+            None if strip is None else set(strip),
+            self._mime_types[self._type_ids[order]],
+        )
+
+    def mime_type(self, order: int) -> bytes:
+        """Return the MIME type of the pattern at position *order*."""
+        return self._mime_types[self._type_ids[order]]
+
+    def match_at(self, order: int, input_bytes: bytes, offset: int, complete: bool = True) -> bool:
+        """Return True if the input bytes match the pattern at position
+        *order* at *offset*, like :func:`_match_at`."""
+        start = self._starts[order]
+        size = self._sizes[order]
+        mask_id = self._mask_ids[order]
+        end = offset + size
+        if end <= len(input_bytes):
+            if mask_id < 0:
+                return input_bytes[offset:end] == self._arena[start : start + size]
+            value = int.from_bytes(self._arena[start : start + size], "big")
+            return int.from_bytes(input_bytes[offset:end], "big") & self._masks[mask_id] == value
+
+        if complete:
             return False
-        input_index += 1
-        pattern_index += 1
 
-    return True
+        arena = self._arena
+        mask_start = None if mask_id < 0 else start + size
+        for index in range(len(input_bytes) - offset):
+            mask = 0xFF if mask_start is None else arena[mask_start + index]
+            if input_bytes[offset + index] & mask != arena[start + index]:
+                return False
+        raise NeedMoreData
+
+
+class PatternIndex:
+    """Patterns indexed by the value of their first significant byte.
+
+    Each pattern is dispatched on the first byte that its mask does not ignore,
+    located after skipping the pattern's leading bytes, so that :meth:`match`
+    only tries the patterns that can possibly match the input, in their
+    original order. The patterns are stored in a :class:`PatternArena`, which
+    is used as is if *patterns* is one, and the index only adds arrays of
+    positions in it.
+
+    If *complete* is ``False``, the input is considered the beginning of a
+    longer input, and :exc:`NeedMoreData` is raised instead of returning a
+    result that more bytes could change.
+
+    An index is not modified once built, so many threads can use it at once.
+    """
+
+    def __init__(self, patterns: Iterable[MimePattern]):
+        self.patterns = patterns if isinstance(patterns, PatternArena) else PatternArena(patterns)
+        strip_ids = self.patterns._strip_ids
+        tables: Dict[Tuple[int, int], List[List[int]]] = {}
+        unkeyed = []
+
+        for order, (byte_pattern, pattern_mask, _, _) in enumerate(self.patterns):
+            position = next((i for i, mask in enumerate(pattern_mask) if mask), None)
+            if position is None:
+                unkeyed.append(order)
+                continue
+
+            table = tables.get((strip_ids[order], position))
+            if table is None:
+                table = tables[strip_ids[order], position] = [[] for _ in range(256)]
+            for byte in _masked_values(byte_pattern[position], pattern_mask[position]):
+                table[byte].append(order)
+
+        self._strips = tuple(
+            byte_table(strip) if strip else None for strip in self.patterns._strips
+        )
+        self._tables = tuple(
+            (
+                strip_id,
+                position,
+                tuple(array("I", bucket) if bucket else () for bucket in table),
+                array("I", sorted(set(chain.from_iterable(table)))),
+            )
+            for (strip_id, position), table in tables.items()
+        )
+        self._unkeyed = array("I", unkeyed)
+
+    def match(self, input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+        order = self.find(input_bytes, complete)
+        return None if order is None else self.patterns.mime_type(order)
+
+    def find(self, input_bytes: bytes, complete: bool = True) -> Optional[int]:
+        """Return the position in :attr:`patterns` of the first pattern that
+        matches *input_bytes*, or ``None``."""
+        input_size = len(input_bytes)
+        offsets = [skip_bytes(input_bytes, 0, strip) if strip else 0 for strip in self._strips]
+
+        buckets = []
+        for strip_id, position, table, entries in self._tables:
+            index = offsets[strip_id] + position
+            if index < input_size:
+                bucket = table[input_bytes[index]]
+            elif complete:
+                continue
+            else:
+                bucket = entries
+            if bucket:
+                buckets.append(bucket)
+
+        if self._unkeyed:
+            buckets.append(self._unkeyed)
+
+        if not buckets:
+            return None
+
+        candidates = buckets[0] if len(buckets) == 1 else sorted(chain.from_iterable(buckets))
+        # PatternArena.match_at, inlined for complete inputs.
+        patterns = self.patterns
+        arena, starts, sizes, mask_ids, masks, strip_ids = patterns._columns
+        for order in candidates:
+            offset = offsets[strip_ids[order]]
+            size = sizes[order]
+            end = offset + size
+            if end <= input_size:
+                mask_id = mask_ids[order]
+                if mask_id < 0:
+                    start = starts[order]
+                    if input_bytes[offset:end] == arena[start : start + size]:
+                        return order
+                else:
+                    start = starts[order]
+                    value = int.from_bytes(arena[start : start + size], "big")
+                    if int.from_bytes(input_bytes[offset:end], "big") & masks[mask_id] == value:
+                        return order
+            elif not complete and patterns.match_at(order, input_bytes, offset, False):
+                return order
+
+        return None
+
+    def find_all(self, input_bytes: bytes) -> List[int]:
+        """Return the positions in :attr:`patterns` of all the patterns that
+        match *input_bytes*, in order."""
+        input_size = len(input_bytes)
+        offsets = [skip_bytes(input_bytes, 0, strip) if strip else 0 for strip in self._strips]
+        buckets = [
+            table[input_bytes[offsets[strip_id] + position]]
+            for strip_id, position, table, _ in self._tables
+            if offsets[strip_id] + position < input_size
+        ]
+        buckets.append(self._unkeyed)
+        match_at = self.patterns.match_at
+        strip_ids = self.patterns._strip_ids
+        return [
+            order
+            for order in sorted(chain.from_iterable(buckets))
+            if match_at(order, input_bytes, offsets[strip_ids[order]])
+        ]
+
+
+class PatternList:
+    """Patterns tried one after another.
+
+    Unlike :class:`PatternIndex`, building a pattern list costs nothing, so it
+    suits patterns that are only used to match a single input.
+    :meth:`match` returns the same result as :meth:`PatternIndex.match`.
+    """
+
+    def __init__(self, patterns: Iterable[MimePattern]):
+        self.patterns = tuple(patterns)
+
+    def match(self, input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+        order = self.find(input_bytes, complete)
+        return None if order is None else self.patterns[order][3]
+
+    def _find_iter(self, input_bytes: bytes, complete: bool) -> Iterator[int]:
+        input_size = len(input_bytes)
+        for order, (byte_pattern, pattern_mask, lstrip, _) in enumerate(self.patterns):
+            if len(byte_pattern) != len(pattern_mask):
+                raise ValueError("pattern's length should match mask's length")
+
+            offset = 0
+            if lstrip:
+                while offset < input_size and _BYTES[input_bytes[offset]] in lstrip:
+                    offset += 1
+
+            masked = _compile_mask(byte_pattern, pattern_mask)
+            if _match_at(input_bytes, offset, byte_pattern, pattern_mask, masked, complete):
+                yield order
+
+    def find(self, input_bytes: bytes, complete: bool = True) -> Optional[int]:
+        """Return the position in :attr:`patterns` of the first pattern that
+        matches *input_bytes*, or ``None``."""
+        return next(self._find_iter(input_bytes, complete), None)
+
+    def find_all(self, input_bytes: bytes) -> List[int]:
+        """Return the positions in :attr:`patterns` of all the patterns that
+        match *input_bytes*, in order."""
+        return list(self._find_iter(input_bytes, True))
+
+
+def _masked_values(value: int, mask: int) -> List[int]:
+    """Return the byte values that are equal to *value* once masked with
+    *mask*."""
+    if value & ~mask:
+        return []
+
+    free_bits = ~mask & 0xFF
+    values = [value | free_bits]
+    subset = free_bits
+    while subset:
+        subset = (subset - 1) & free_bits
+        values.append(value | subset)
+    return values
+
+
+def byte_table(byte_set: Iterable[bytes]) -> Tuple[bool, ...]:
+    """Return a table that tells, for each byte value, if it is in
+    *byte_set*."""
+    return tuple(_BYTES[value] in byte_set for value in range(256))
+
+
+def skip_bytes(input_bytes: bytes, offset: int, table: Tuple[bool, ...]) -> int:
+    """Return the offset of the first byte of the input bytes at or after
+    *offset* that is not in *table*, or the input size."""
+    input_size = len(input_bytes)
+    while offset < input_size and table[input_bytes[offset]]:
+        offset += 1
+    return offset
+
+
+_WHITESPACE = byte_table(WHITESPACE_BYTES)
+
+
+def skip_whitespace(input_bytes: bytes, offset: int = 0) -> int:
+    """Return the offset of the first byte of the input bytes at or after
+    *offset* that is not whitespace, or the input size."""
+    return skip_bytes(input_bytes, offset, _WHITESPACE)
+
+
+def _is_ascii_letter(byte: int) -> bool:
+    return 0x41 <= byte <= 0x5A or 0x61 <= byte <= 0x7A
+
+
+class TextPatternIndex(PatternIndex):
+    """Patterns, like :data:`TEXT_PATTERNS`, whose leading bytes are either
+    whitespace or none.
+
+    Leading whitespace is skipped once, and patterns that are a ``<`` followed
+    by ASCII-case-insensitive letters and other bytes, such as HTML tags, are
+    looked up in a table keyed by the upper-cased bytes that follow the ``<``.
+    Other patterns are compared one by one. :meth:`find` returns the same
+    result as :meth:`PatternIndex.find`.
+    """
+
+    def __init__(self, patterns: Iterable[MimePattern]):
+        super().__init__(patterns)
+        self._tags: Dict[bytes, int] = {}
+        stripped: List[int] = []
+        unstripped: List[int] = []
+        first_bytes: Tuple[Set[int], Set[int]] = (set(), set())
+
+        for order, (byte_pattern, pattern_mask, lstrip, _) in enumerate(self.patterns):
+            if lstrip and lstrip != WHITESPACE_BYTES:
+                raise ValueError("leading bytes should be whitespace or none")
+
+            tag = byte_pattern[1:].upper()
+            if (
+                lstrip
+                and byte_pattern[:1] == b"<"
+                and pattern_mask[0] == 0xFF
+                and all(
+                    mask == (0xDF if _is_ascii_letter(byte) else 0xFF)
+                    for byte, mask in zip(tag, pattern_mask[1:])
+                )
+            ):
+                self._tags.setdefault(tag, order)
+                continue
+
+            (stripped if lstrip else unstripped).append(order)
+            first_bytes[0 if lstrip else 1].update(
+                _masked_values(byte_pattern[0], pattern_mask[0]) if byte_pattern else range(256)
+            )
+
+        self._stripped = tuple(stripped)
+        self._unstripped = tuple(unstripped)
+        self._tag_lengths = tuple(sorted({len(tag) for tag in self._tags}))
+        self._first_bytes = tuple(frozenset(values) for values in first_bytes)
+
+    def find(self, input_bytes: bytes, complete: bool = True) -> Optional[int]:
+        if not complete:
+            return super().find(input_bytes, complete)
+
+        found: Optional[int] = None
+        offset = skip_whitespace(input_bytes)
+        if self._tag_lengths and offset < len(input_bytes) and input_bytes[offset] == 0x3C:
+            tag = bytes(input_bytes[offset + 1 : offset + 1 + self._tag_lengths[-1]]).upper()
+            for length in self._tag_lengths:
+                tag_order = self._tags.get(tag[:length])
+                if tag_order is not None and (found is None or tag_order < found):
+                    found = tag_order
+
+        input_size = len(input_bytes)
+        arena, starts, sizes, mask_ids, masks, _ = self.patterns._columns
+        for entries, entry_offset, first_bytes in (
+            (self._stripped, offset, self._first_bytes[0]),
+            (self._unstripped, 0, self._first_bytes[1]),
+        ):
+            if entry_offset >= input_size or input_bytes[entry_offset] not in first_bytes:
+                continue
+            for order in entries:
+                if found is not None and order > found:
+                    break
+                # PatternArena.match_at, inlined.
+                size = sizes[order]
+                end = entry_offset + size
+                if end > input_size:
+                    continue
+                mask_id = mask_ids[order]
+                if mask_id < 0:
+                    start = starts[order]
+                    matched = input_bytes[entry_offset:end] == arena[start : start + size]
+                else:
+                    start = starts[order]
+                    value = int.from_bytes(arena[start : start + size], "big")
+                    matched = (
+                        int.from_bytes(input_bytes[entry_offset:end], "big") & masks[mask_id]
+                        == value
+                    )
+                if matched:
+                    found = order
+                    break
+
+        return found
+
+
+def _compile_mask(byte_pattern: bytes, pattern_mask: bytes) -> Optional[Tuple[int, int]]:
+    """Return ``None`` if every byte of *pattern_mask* is ``ff``, so that input
+    bytes can be compared with *byte_pattern* as is, or else the mask and the
+    pattern as big-endian integers, to compare input bytes at once."""
+    if pattern_mask.count(0xFF) == len(pattern_mask):
+        return None
+    return int.from_bytes(pattern_mask, "big"), int.from_bytes(byte_pattern, "big")
+
+
+def _match_at(
+    input_bytes: bytes,
+    offset: int,
+    byte_pattern: bytes,
+    pattern_mask: bytes,
+    masked: Optional[Tuple[int, int]],
+    complete: bool = True,
+) -> bool:
+    """Return True if the input bytes match a pattern at *offset*, where
+    *masked* is the result of :func:`_compile_mask` for the pattern."""
+    end = offset + len(byte_pattern)
+    if end <= len(input_bytes):
+        if masked is None:
+            return input_bytes[offset:end] == byte_pattern
+        mask, value = masked
+        return int.from_bytes(input_bytes[offset:end], "big") & mask == value
+
+    if complete:
+        return False
+
+    for index in range(len(input_bytes) - offset):
+        if input_bytes[offset + index] & pattern_mask[index] != byte_pattern[index]:
+            return False
+    raise NeedMoreData
+
+
+_INDEXED_PATTERNS: Dict[str, Tuple[Type[PatternIndex], Iterable[MimePattern]]] = {
+    "IMAGE_INDEX": (PatternIndex, IMAGE_PATTERNS),
+    "AUDIO_VIDEO_INDEX": (PatternIndex, AUDIO_VIDEO_PATTERNS),
+    "FONT_INDEX": (PatternIndex, FONT_PATTERNS),
+    "ARCHIVE_INDEX": (PatternIndex, ARCHIVE_PATTERNS),
+    "TEXT_INDEX": (TextPatternIndex, TEXT_PATTERNS),
+    "EXTRA_INDEX": (PatternIndex, EXTRA_PATTERNS),
+}
+
+
+@lru_cache(maxsize=None)
+def pattern_index(name: str) -> PatternIndex:
+    """Return the index *name*, e.g. ``"TEXT_INDEX"``, of a pattern table.
+
+    Indexes are only built on first use, so that importing xtractmime does
+    not build them. They are also the module attributes of the same name.
+    """
+    index_class, patterns = _INDEXED_PATTERNS[name]
+    return index_class(patterns)
+
+
+def __getattr__(name: str) -> PatternIndex:
+    if name in _INDEXED_PATTERNS:
+        return pattern_index(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def is_mp4_signature(input_bytes: bytes) -> bool:
@@ -81,7 +580,7 @@ def is_mp4_signature(input_bytes: bytes) -> bool:
     if input_size < 12:
         return False
 
-    box_size = unpack(">I", input_bytes[0:4])[0]
+    box_size = unpack_from(">I", input_bytes)[0]
 
     if input_size < box_size or box_size % 4:
         return False
@@ -93,15 +592,37 @@ def is_mp4_signature(input_bytes: bytes) -> bool:
         return True
 
     bytes_read = 16
-    while bytes_read < box_size:
-        if input_bytes[bytes_read : bytes_read + 3] == b"mp4":
+    while bytes_read < box_size and bytes_read + 3 <= input_size:
+        if (
+            input_bytes[bytes_read] == 0x6D  # m
+            and input_bytes[bytes_read + 1] == 0x70  # p
+            and input_bytes[bytes_read + 2] == 0x34  # 4
+        ):
             return True
         bytes_read += 4
 
     return False
 
 
-def parse_vint_number_size(input_bytes: memoryview) -> int:
+def may_be_mp4_signature(input_bytes: bytes) -> bool:
+    """Return False if :func:`is_mp4_signature` cannot match any input that
+    starts with the input bytes, or True otherwise."""
+    input_size = len(input_bytes)
+    if input_size >= 4:
+        box_size = unpack_from(">I", input_bytes)[0]
+        if box_size % 4:
+            return False
+
+        if input_size >= 12 and input_size >= box_size:
+            return False
+
+    if input_size >= 8 and input_bytes[4:8] != b"ftyp":
+        return False
+
+    return True
+
+
+def parse_vint_number_size(input_bytes: bytes, index: int = 0) -> int:
     """Return an integer value by which the index in the current input bytes of a
     WebM file should be incremented
 
@@ -109,11 +630,11 @@ def parse_vint_number_size(input_bytes: memoryview) -> int:
     This implementation doesn't compute the value for "parsed number" as there is
     no specific use of it in implementing the function "is_webm_signature()".
     """
-    input_size = len(input_bytes)
+    input_size = len(input_bytes) - index
     mask = 128
     max_vint_size = 8
     limit = min(max_vint_size, input_size)
-    first_byte = input_bytes[0]
+    first_byte = input_bytes[index]
     for number_size in range(1, limit):
         if first_byte & mask:
             return number_size
@@ -135,20 +656,24 @@ def is_webm_signature(input_bytes: bytes) -> bool:
     if input_size < 4:
         return False
 
-    if input_bytes[:4] != bytes.fromhex("1a 45 df a3"):
+    if input_bytes[:4] != _WEBM_MAGIC:
         return False
 
     index = 4
 
     limit = min(input_size, 38)
     while index < limit:
-        if input_bytes[index : index + 2] == bytes.fromhex("42 82"):
+        if (
+            input_bytes[index] == 0x42
+            and index + 1 < input_size
+            and input_bytes[index + 1] == 0x82
+        ):
             index += 2
 
             if index >= input_size:
                 break
 
-            number_size = parse_vint_number_size(memoryview(input_bytes)[index:])
+            number_size = parse_vint_number_size(input_bytes, index)
             index += number_size
 
             if index >= input_size - 4:
@@ -161,13 +686,26 @@ def is_webm_signature(input_bytes: bytes) -> bool:
     return False
 
 
+#: :func:`is_webm_signature` reads at most this many bytes, so its result for
+#: an input this long or longer does not depend on the rest of the input.
+WEBM_SIGNATURE_LENGTH = 52
+
+
+def may_be_webm_signature(input_bytes: bytes) -> bool:
+    """Return False if :func:`is_webm_signature` cannot match any input that
+    starts with the input bytes, or True otherwise."""
+    input_size = len(input_bytes)
+    if input_bytes[:4] != _WEBM_MAGIC[:input_size]:
+        return False
+
+    return input_size < WEBM_SIGNATURE_LENGTH
+
+
 def match_mp3_header(input_bytes: bytes, input_size: int, index: int) -> bool:
     if input_size < 4:
         return False
 
-    if input_bytes[index : index + 1] != bytes.fromhex("ff") or bytes(
-        [input_bytes[index + 1] & 224]
-    ) != bytes.fromhex("e0"):
+    if input_size < index + 3 or input_bytes[index] != 0xFF or input_bytes[index + 1] & 224 != 224:
         return False
 
     layer = (input_bytes[index + 1] & 6) >> 1
@@ -260,66 +798,127 @@ def is_mp3_non_ID3_signature(input_bytes: bytes) -> bool:
         return False
 
 
-def get_image_mime(input_bytes: bytes) -> Optional[bytes]:
-    for pattern in IMAGE_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
+def may_be_mp3_non_ID3_signature(input_bytes: bytes) -> bool:
+    """Return False if :func:`is_mp3_non_ID3_signature` cannot match any
+    input that starts with the input bytes, or True otherwise."""
+    input_size = len(input_bytes)
+    if input_size < 4:
+        return True
 
-    return None
+    if not match_mp3_header(input_bytes, input_size, 0):
+        return False
 
+    skipped_bytes = mp3_framesize(*parse_mp3_frame(input_bytes))
+    return skipped_bytes >= 4 and skipped_bytes + 4 >= input_size
 
-def get_audio_video_mime(input_bytes: bytes) -> Optional[bytes]:
-    for pattern in AUDIO_VIDEO_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
+
+#: Groups of signatures, with their patterns, in the order in which the
+#: first signature that matches determines the MIME type of a resource.
+SIGNATURE_GROUPS = (
+    ("text", TEXT_PATTERNS),
+    ("extra", EXTRA_PATTERNS),
+    ("image", IMAGE_PATTERNS),
+    ("audio/video", AUDIO_VIDEO_PATTERNS),
+    ("font", FONT_PATTERNS),
+    ("archive", ARCHIVE_PATTERNS),
+)
+
+
+@lru_cache(maxsize=None)
+def _signature_index() -> Tuple[PatternIndex, Tuple[str, ...]]:
+    """Return the patterns of all :data:`SIGNATURE_GROUPS` in a single index,
+    and the group of each pattern."""
+    index = PatternIndex(chain.from_iterable(patterns for _, patterns in SIGNATURE_GROUPS))
+    groups = tuple(group for group, patterns in SIGNATURE_GROUPS for _ in patterns)
+    return index, groups
+
+
+def _audio_video_signatures(input_bytes: bytes) -> List[bytes]:
+    signatures = []
+    if is_mp4_signature(input_bytes):
+        signatures.append(b"video/mp4")
+    if is_webm_signature(input_bytes):
+        signatures.append(b"video/webm")
+    if is_mp3_non_ID3_signature(input_bytes):
+        signatures.append(b"audio/mpeg")
+    return signatures
+
+
+def find_signatures(input_bytes: bytes) -> List[Tuple[str, bytes]]:
+    """Return the group and MIME type of every signature that matches
+    *input_bytes*, in the order of :data:`SIGNATURE_GROUPS`, the mp4, webm and
+    mp3 signatures following the audio/video patterns.
+
+    All patterns are dispatched at once on the bytes of *input_bytes*."""
+    index, groups = _signature_index()
+    signatures: List[Tuple[str, bytes]] = []
+    audio_video = False
+    for order in index.find_all(input_bytes):
+        group = groups[order]
+        if group in ("font", "archive") and not audio_video:
+            audio_video = True
+            signatures.extend(
+                ("audio/video", mime_type) for mime_type in _audio_video_signatures(input_bytes)
+            )
+        signatures.append((group, index.patterns.mime_type(order)))
+    if not audio_video:
+        signatures.extend(
+            ("audio/video", mime_type) for mime_type in _audio_video_signatures(input_bytes)
+        )
+    return signatures
+
+
+def get_image_mime(input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+    return pattern_index("IMAGE_INDEX").match(input_bytes, complete)
+
+
+def get_audio_video_mime(input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+    matched_type = pattern_index("AUDIO_VIDEO_INDEX").match(input_bytes, complete)
+    if matched_type:
+        return matched_type
 
     if is_mp4_signature(input_bytes):
         return b"video/mp4"
 
+    if not complete and may_be_mp4_signature(input_bytes):
+        raise NeedMoreData
+
     if is_webm_signature(input_bytes):
         return b"video/webm"
 
+    if not complete and may_be_webm_signature(input_bytes):
+        raise NeedMoreData
+
     if is_mp3_non_ID3_signature(input_bytes):
         return b"audio/mpeg"
 
-    return None
-
-
-def get_font_mime(input_bytes: bytes) -> Optional[bytes]:
-    for pattern in FONT_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
+    if not complete and may_be_mp3_non_ID3_signature(input_bytes):
+        raise NeedMoreData
 
     return None
 
 
-def get_archive_mime(input_bytes: bytes) -> Optional[bytes]:
-    for pattern in ARCHIVE_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
+def get_font_mime(input_bytes: bytes) -> Optional[bytes]:
+    return pattern_index("FONT_INDEX").match(input_bytes)
 
-    return None
 
+def get_archive_mime(input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+    return pattern_index("ARCHIVE_INDEX").match(input_bytes, complete)
 
-def get_text_mime(input_bytes: bytes) -> Optional[bytes]:
-    for pattern in TEXT_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
 
-    return None
+def get_text_mime(input_bytes: bytes, complete: bool = True) -> Optional[bytes]:
+    return pattern_index("TEXT_INDEX").match(input_bytes, complete)
 
 
 def get_extra_mime(
     input_bytes: bytes,
-    extra_types: Optional[Tuple[Tuple[bytes, bytes, Optional[Set[bytes]], bytes], ...]],
+    extra_types: Optional[Sequence[MimePattern]],
 ) -> Optional[bytes]:
-    for pattern in EXTRA_PATTERNS:
-        if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-            return pattern[3]
+    matched_type = pattern_index("EXTRA_INDEX").match(input_bytes)
+    if matched_type:
+        return matched_type
 
     if extra_types:
-        for pattern in extra_types:
-            if is_match_mime_pattern(input_bytes, pattern[0], pattern[1], pattern[2]):
-                return pattern[3]
+        return PatternList(extra_types).match(input_bytes)
 
     return None
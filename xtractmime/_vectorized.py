@@ -0,0 +1,239 @@
+"""Matching of many resource headers at once with NumPy."""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError as exception:
+    raise ImportError(
+        "Sniffing with NumPy requires it to be installed: pip install xtractmime[numpy]"
+    ) from exception
+
+from xtractmime import is_binary_data
+from xtractmime._patterns import (
+    ARCHIVE_PATTERNS,
+    AUDIO_VIDEO_PATTERNS,
+    EXTRA_PATTERNS,
+    IMAGE_PATTERNS,
+    TEXT_PATTERNS,
+    WHITESPACE_BYTES,
+)
+from xtractmime._utils import (
+    MimePattern,
+    byte_table,
+    is_mp3_non_ID3_signature,
+    is_mp4_signature,
+    is_webm_signature,
+    skip_bytes,
+    skip_whitespace,
+)
+
+#: Number of resource headers matched at once, which bounds the size of the
+#: temporary arrays.
+CHUNK_SIZE = 4096
+
+_WHITESPACE = frozenset(WHITESPACE_BYTES)
+_WEBM_MAGIC = numpy.frombuffer(b"\x1a\x45\xdf\xa3", dtype=numpy.uint8)
+_FTYP = numpy.frombuffer(b"ftyp", dtype=numpy.uint8)
+_WORD_SIZE = numpy.dtype(numpy.uint64).itemsize
+#: Number of leading bytes that :func:`_may_match_signature` looks at.
+_SIGNATURE_WINDOW_SIZE = 12
+
+
+def _byte_table(byte_set: Iterable[bytes]) -> numpy.ndarray:
+    return numpy.array(byte_table(byte_set), dtype=bool)
+
+
+class Batch:
+    """Resource headers, and windows of their leading bytes as the rows of
+    2-D arrays.
+
+    Only the windows are matched with NumPy, so their size, which is that of
+    the longest pattern, bounds the work done per resource header.
+    """
+
+    def __init__(self, headers: Sequence[bytes], window_size: int):
+        self.headers = headers
+        self.window_size = -(-window_size // _WORD_SIZE) * _WORD_SIZE
+        self.lengths = numpy.fromiter(map(len, headers), numpy.int64, len(headers))
+        self._starts = numpy.cumsum(self.lengths) - self.lengths
+        self._data = numpy.frombuffer(
+            b"".join([*headers, bytes(self.window_size)]), dtype=numpy.uint8
+        )
+        self._windows: Dict[FrozenSet[bytes], Tuple[numpy.ndarray, numpy.ndarray]] = {}
+
+    def _offsets(self, strip: FrozenSet[bytes]) -> numpy.ndarray:
+        offsets: numpy.ndarray = numpy.zeros(len(self.headers), dtype=numpy.int64)
+        if not strip:
+            return offsets
+        windows, available = self.windows(frozenset())
+        rows = numpy.flatnonzero(_byte_table(strip)[windows[:, 0]] & (available > 0))
+        if strip == _WHITESPACE:
+            for row in rows.tolist():
+                offsets[row] = skip_whitespace(self.headers[row])
+        else:
+            table = byte_table(strip)
+            for row in rows.tolist():
+                offsets[row] = skip_bytes(self.headers[row], 0, table)
+        return offsets
+
+    def windows(self, strip: FrozenSet[bytes]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return the first :attr:`window_size` bytes of each resource header
+        after its leading bytes in *strip*, and the number of bytes available
+        after the leading bytes; the bytes of a window past those available
+        are unspecified."""
+        if strip not in self._windows:
+            offsets = self._offsets(strip)
+            columns = (self._starts + offsets)[:, None] + numpy.arange(self.window_size)
+            self._windows[strip] = self._data[columns], self.lengths - offsets
+        return self._windows[strip]
+
+    def words(self, strip: FrozenSet[bytes]) -> Tuple[numpy.ndarray, numpy.ndarray]:
+        """Return :meth:`windows` with the bytes of each window grouped in
+        64-bit words."""
+        windows, available = self.windows(strip)
+        return windows.view(numpy.uint64), available
+
+
+def _words(data: bytes, size: int) -> numpy.ndarray:
+    """Return *data*, padded with zeros to *size* bytes, as 64-bit words."""
+    return numpy.frombuffer(data.ljust(size, b"\x00"), dtype=numpy.uint64)
+
+
+class VectorizedPatterns:
+    """Patterns matched against all the resource headers of a :class:`Batch`
+    at once.
+
+    :meth:`find` returns, for each resource header, the same result as
+    :meth:`xtractmime._utils.PatternIndex.find`.
+    """
+
+    def __init__(self, patterns: Iterable[MimePattern]):
+        self.patterns = tuple(patterns)
+        self.mime_types: numpy.ndarray = numpy.empty(len(self.patterns), dtype=object)
+        self.mime_types[:] = [pattern[3] for pattern in self.patterns]
+        self.window_size = max((len(pattern[0]) for pattern in self.patterns), default=0)
+        entries = []
+        for order, (byte_pattern, pattern_mask, lstrip, _) in enumerate(self.patterns):
+            if len(byte_pattern) != len(pattern_mask):
+                raise ValueError("pattern's length should match mask's length")
+            size = len(byte_pattern)
+            word_size = -(-size // _WORD_SIZE) * _WORD_SIZE
+            entries.append(
+                (
+                    order,
+                    frozenset(byte for byte in lstrip or () if len(byte) == 1),
+                    size,
+                    tuple(
+                        zip(
+                            _words(pattern_mask, word_size).tolist(),
+                            # As in PatternIndex, a pattern with bits outside
+                            # its mask never matches.
+                            _words(byte_pattern, word_size).tolist(),
+                        )
+                    ),
+                )
+            )
+        # Matching the last pattern first lets the first pattern that matches
+        # overwrite the others.
+        self._entries = tuple(reversed(entries))
+
+    def find(self, batch: Batch) -> numpy.ndarray:
+        """Return the position in :attr:`patterns` of the first pattern that
+        matches each resource header of *batch*, or -1."""
+        found: numpy.ndarray = numpy.full(len(batch.headers), -1, dtype=numpy.int64)
+        for order, strip, size, words in self._entries:
+            windows, available = batch.words(strip)
+            matched = available >= size
+            for column, (mask, pattern) in enumerate(words):
+                matched &= (windows[:, column] & numpy.uint64(mask)) == numpy.uint64(pattern)
+            found[matched] = order
+        return found
+
+
+TEXT = VectorizedPatterns(TEXT_PATTERNS)
+EXTRA = VectorizedPatterns(EXTRA_PATTERNS)
+IMAGE = VectorizedPatterns(IMAGE_PATTERNS)
+AUDIO_VIDEO = VectorizedPatterns(AUDIO_VIDEO_PATTERNS)
+ARCHIVE = VectorizedPatterns(ARCHIVE_PATTERNS)
+
+_WINDOW_SIZE = max(
+    _SIGNATURE_WINDOW_SIZE,
+    *(patterns.window_size for patterns in (TEXT, EXTRA, IMAGE, AUDIO_VIDEO, ARCHIVE)),
+)
+
+
+def _match_signature(header: bytes) -> Optional[bytes]:
+    if is_mp4_signature(header):
+        return b"video/mp4"
+    if is_webm_signature(header):
+        return b"video/webm"
+    if is_mp3_non_ID3_signature(header):
+        return b"audio/mpeg"
+    return None
+
+
+def _may_match_signature(batch: Batch) -> numpy.ndarray:
+    """Return which resource headers of *batch* could match one of the
+    signatures of :func:`_match_signature`."""
+    windows, lengths = batch.windows(frozenset())
+    mp4 = (lengths >= 12) & (windows[:, 4:8] == _FTYP).all(axis=1)
+    webm = (lengths >= 4) & (windows[:, :4] == _WEBM_MAGIC).all(axis=1)
+    mp3 = (lengths >= 4) & (windows[:, 0] == 0xFF) & (windows[:, 1] & 0xE0 == 0xE0)
+    return mp4 | webm | mp3
+
+
+def _find_unknown_mimetypes_chunk(
+    headers: Sequence[bytes],
+    sniff_scriptable: bool,
+    extra_types: Optional[VectorizedPatterns],
+) -> List[Optional[bytes]]:
+    window_size = max(_WINDOW_SIZE, extra_types.window_size if extra_types else 0)
+    batch = Batch(headers, window_size)
+    results: numpy.ndarray = numpy.full(len(headers), None, dtype=object)
+    undecided: numpy.ndarray = numpy.ones(len(headers), dtype=bool)
+
+    def decide(patterns: VectorizedPatterns) -> None:
+        found = patterns.find(batch)
+        matched = undecided & (found >= 0)
+        results[matched] = patterns.mime_types[found[matched]]
+        undecided[matched] = False
+
+    if sniff_scriptable:
+        decide(TEXT)
+    decide(EXTRA)
+    if extra_types is not None:
+        decide(extra_types)
+    decide(IMAGE)
+    decide(AUDIO_VIDEO)
+
+    for row in numpy.flatnonzero(undecided & _may_match_signature(batch)).tolist():
+        matched_type = _match_signature(headers[row])
+        if matched_type:
+            results[row] = matched_type
+            undecided[row] = False
+
+    decide(ARCHIVE)
+
+    for row in numpy.flatnonzero(undecided).tolist():
+        results[row] = (
+            b"application/octet-stream" if is_binary_data(headers[row]) else b"text/plain"
+        )
+    return results.tolist()
+
+
+def find_unknown_mimetypes(
+    headers: Sequence[bytes],
+    sniff_scriptable: bool,
+    extra_types: Optional[VectorizedPatterns] = None,
+) -> List[Optional[bytes]]:
+    """Return the result of :meth:`xtractmime.Sniffer._find_unknown_mimetype`
+    for each of the resource headers, *extra_types* being the compiled
+    ``extra_types`` of the sniffer."""
+    results: List[Optional[bytes]] = []
+    for start in range(0, len(headers), CHUNK_SIZE):
+        results.extend(
+            _find_unknown_mimetypes_chunk(
+                headers[start : start + CHUNK_SIZE], sniff_scriptable, extra_types
+            )
+        )
+    return results
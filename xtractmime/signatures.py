@@ -0,0 +1,213 @@
+"""Loading of signature databases as ``extra_types``."""
+import os
+import sys
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH
+from xtractmime._utils import MimePattern, PatternArena
+
+_MAGIC_HEADER = b"MIME-Magic\0\n"
+
+_Path = Union[str, "os.PathLike[str]"]
+
+
+def _parse_signatures(file: BinaryIO, name: str) -> Iterator[MimePattern]:
+    for line_number, line in enumerate(file, 1):
+        fields = line.split(b"#", 1)[0].split()
+        if not fields:
+            continue
+        try:
+            if len(fields) > 4:
+                raise ValueError("too many fields")
+            mime_type = fields[0]
+            offset, colon, pattern = fields[1].rpartition(b":")
+            padding = bytes(int(offset) if colon else 0)
+            byte_pattern = bytes.fromhex(pattern.decode())
+            if len(fields) < 3 or fields[2] == b"-":
+                pattern_mask = b"\xff" * len(byte_pattern)
+            else:
+                pattern_mask = bytes.fromhex(fields[2].decode())
+            lstrip = None
+            if len(fields) == 4:
+                lstrip = {bytes((byte,)) for byte in bytes.fromhex(fields[3].decode())}
+            if len(byte_pattern) != len(pattern_mask):
+                raise ValueError("pattern's length should match mask's length")
+            byte_pattern = bytes(byte & mask for byte, mask in zip(byte_pattern, pattern_mask))
+            if len(padding) + len(byte_pattern) > RESOURCE_HEADER_BUFFER_LENGTH:
+                raise ValueError("pattern ends after the resource header")
+        except (IndexError, ValueError) as error:
+            raise ValueError(f"{name}:{line_number}: invalid signature: {error}") from error
+        yield padding + byte_pattern, padding + pattern_mask, lstrip, mime_type
+
+
+def load_signatures(path: _Path) -> PatternArena:
+    """Return the signatures of the signature file at *path*, to pass as
+    *extra_types*.
+
+    Each line of the file is a MIME type, a pattern with an optional offset,
+    an optional mask, with which the pattern is masked, and optional leading
+    bytes, separated by whitespace, and ``#`` starts a comment. A
+    :exc:`ValueError` is raised for an invalid line.
+    """
+    with open(path, "rb") as file:
+        return PatternArena(_parse_signatures(file, os.fspath(path)))
+
+
+class _MagicRule(NamedTuple):
+    offset: int
+    value: bytes
+    mask: bytes
+    range_length: int
+    #: Nested rules, of which one must match along with the rule.
+    children: list
+
+
+def _parse_number(data: bytes, start: int, end: bytes) -> Tuple[int, int]:
+    """Return the decimal number of *data* at *start*, which *end* follows,
+    and the position after *end*."""
+    stop = data.index(end, start)
+    if not data[start:stop].isdigit():
+        raise ValueError(f"invalid number at byte {start}")
+    return int(data[start:stop]), stop + len(end)
+
+
+def _parse_rule(data: bytes, position: int) -> Tuple[int, _MagicRule, Optional[int], int]:
+    """Return the indent, the rule and the word size of the line of *data* at
+    *position*, and the position of the next line."""
+    indent = 0
+    if data[position : position + 1] != b">":
+        indent, position = _parse_number(data, position, b">")
+    else:
+        position += 1
+    offset, position = _parse_number(data, position, b"=")
+    length = int.from_bytes(data[position : position + 2], "big")
+    position += 2
+    value = data[position : position + length]
+    position += length
+    mask = b"\xff" * length
+    if data[position : position + 1] == b"&":
+        mask = data[position + 1 : position + 1 + length]
+        position += 1 + length
+    word_size = None
+    if data[position : position + 1] == b"~":
+        stop = position + 1
+        while data[stop : stop + 1].isdigit():
+            stop += 1
+        word_size = int(data[position + 1 : stop] or b"1")
+        position = stop
+    range_length = 1
+    if data[position : position + 1] == b"+":
+        stop = position + 1
+        while data[stop : stop + 1].isdigit():
+            stop += 1
+        range_length = int(data[position + 1 : stop] or b"1")
+        position = stop
+    if len(value) != length or len(mask) != length or data[position : position + 1] != b"\n":
+        raise ValueError(f"invalid rule at byte {position}")
+    value = bytes(byte & mask_byte for byte, mask_byte in zip(value, mask))
+    return indent, _MagicRule(offset, value, mask, range_length, []), word_size, position + 1
+
+
+def _swap_words(value: bytes, word_size: int) -> bytes:
+    return b"".join(
+        value[start : start + word_size][::-1] for start in range(0, len(value), word_size)
+    )
+
+
+def _merge(
+    first: Tuple[bytes, bytes], second: Tuple[bytes, bytes]
+) -> Optional[Tuple[bytes, bytes]]:
+    """Return the pattern and mask that match what both patterns and masks
+    match, or ``None`` if nothing does."""
+    size = max(len(first[0]), len(second[0]))
+    first_value, first_mask, second_value, second_mask = (
+        int.from_bytes(part.ljust(size, b"\0"), "big") for part in (*first, *second)
+    )
+    if (first_value ^ second_value) & first_mask & second_mask:
+        return None
+    return (
+        (first_value | second_value).to_bytes(size, "big"),
+        (first_mask | second_mask).to_bytes(size, "big"),
+    )
+
+
+def _rule_patterns(rule: _MagicRule, max_range: int) -> Iterator[Tuple[bytes, bytes]]:
+    """Yield a pattern and a mask for each way to match *rule* and one of
+    its children, if it has any, recursively, unless there are more than
+    *max_range* ways to place their values."""
+    if rule.range_length > max_range:
+        return
+    children = [
+        pattern
+        for child in rule.children
+        for pattern in _rule_patterns(child, max_range // rule.range_length)
+    ]
+    if rule.children and not children:
+        return
+    for offset in range(rule.offset, rule.offset + rule.range_length):
+        if offset + len(rule.value) > RESOURCE_HEADER_BUFFER_LENGTH:
+            break
+        placed = (bytes(offset) + rule.value, bytes(offset) + rule.mask)
+        if not rule.children:
+            yield placed
+        for child in children:
+            merged = _merge(placed, child)
+            if merged is not None:
+                yield merged
+
+
+def _parse_magic(data: bytes, max_range: int) -> Iterator[MimePattern]:
+    if not data.startswith(_MAGIC_HEADER):
+        raise ValueError("not a shared-mime-info magic file")
+    sections: List[Tuple[int, bytes, List[_MagicRule]]] = []
+    parents: List[_MagicRule] = []
+    position = len(_MAGIC_HEADER)
+    while position < len(data):
+        if data[position : position + 1] == b"[":
+            end = data.index(b"]\n", position)
+            priority, _, mime_type = data[position + 1 : end].partition(b":")
+            sections.append((int(priority), mime_type, []))
+            parents = []
+            position = end + 2
+            continue
+        if not sections:
+            raise ValueError(f"rule outside a section at byte {position}")
+        indent, rule, word_size, position = _parse_rule(data, position)
+        if indent > len(parents):
+            raise ValueError(f"rule without a parent rule before byte {position}")
+        if word_size and word_size > 1:
+            if len(rule.value) % word_size:
+                raise ValueError(f"value not made of words before byte {position}")
+            if sys.byteorder == "little":
+                rule = rule._replace(
+                    value=_swap_words(rule.value, word_size),
+                    mask=_swap_words(rule.mask, word_size),
+                )
+        del parents[indent:]
+        (parents[-1].children if parents else sections[-1][2]).append(rule)
+        parents.append(rule)
+
+    for _, mime_type, rules in sorted(sections, key=lambda section: -section[0]):
+        for rule in rules:
+            for byte_pattern, pattern_mask in _rule_patterns(rule, max_range):
+                yield byte_pattern, pattern_mask, None, mime_type
+
+
+def load_magic(path: _Path, *, max_range: int = 16) -> PatternArena:
+    """Return the rules of the shared-mime-info ``magic`` file at *path*, such
+    as ``/usr/share/mime/magic``, as signatures to pass as *extra_types*.
+
+    Rules are sorted by decreasing priority, and each rule with nested rules
+    becomes a signature per nested rule that can match with it. A rule that
+    looks for its value at several offsets becomes a signature per offset,
+    and rules whose values, with the values of the rules they are nested in,
+    can be at more than *max_range* combinations of offsets, or that cannot
+    match within the resource header, are skipped. A :exc:`ValueError` is
+    raised if the file is not a valid ``magic`` file.
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    try:
+        return PatternArena(_parse_magic(data, max_range))
+    except (IndexError, ValueError) as error:
+        raise ValueError(f"{os.fspath(path)}: {error}") from error
@@ -0,0 +1,229 @@
+"""Persistent store of sniffing results."""
+import os
+import sqlite3
+from hashlib import sha256
+from threading import Lock
+from typing import BinaryIO, Callable, Dict, Optional, Tuple, Union, cast
+
+from xtractmime import _MISSING, Sniffer, __version__, _parse_content_types
+
+_StoreKey = Tuple[str, str, str, bytes, int]
+
+_CREATE_RESULTS = """
+CREATE TABLE IF NOT EXISTS results (
+    options TEXT NOT NULL,
+    key TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    supplied_type BLOB NOT NULL,
+    no_sniff INTEGER NOT NULL,
+    mime_type BLOB,
+    PRIMARY KEY (options, key, etag, supplied_type, no_sniff)
+)
+"""
+_SELECT = (
+    "SELECT mime_type FROM results "
+    "WHERE options = ? AND key = ? AND etag = ? AND supplied_type = ? AND no_sniff = ?"
+)
+_INSERT = (
+    "INSERT OR REPLACE INTO results (options, key, etag, supplied_type, no_sniff, mime_type) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+# Replacing a result gives it a new, highest rowid, so the rows with the
+# lowest rowids are the oldest ones.
+_EVICT = "DELETE FROM results WHERE rowid <= (SELECT MAX(rowid) FROM results) - ?"
+
+
+def _options_digest(sniffer: Sniffer) -> str:
+    """Return a digest of the version of xtractmime and of the options of
+    *sniffer*, on which the stored results depend."""
+    extra_types = [
+        (byte_pattern, pattern_mask, sorted(lstrip) if lstrip else None, mime_type)
+        for byte_pattern, pattern_mask, lstrip, mime_type in sniffer.extra_types or ()
+    ]
+    options = (
+        __version__,
+        sniffer.http_origin,
+        extra_types,
+        sorted(sniffer.supported_types or ()),
+    )
+    return sha256(repr(options).encode()).hexdigest()
+
+
+def _store_key(
+    options: str,
+    key: str,
+    etag: Optional[str],
+    content_types: Optional[Tuple[bytes]],
+    no_sniff: bool,
+) -> _StoreKey:
+    supplied_type = _parse_content_types(content_types)
+    normalized_type = supplied_type.essence
+    if supplied_type.is_apache_type:
+        normalized_type += b";apache"
+    return options, key, etag or "", normalized_type, int(no_sniff)
+
+
+class SniffStore:
+    """SQLite database of the results of a :class:`~xtractmime.Sniffer`,
+    keyed by the options of the sniffer and the version of xtractmime, by
+    resource, e.g. by URL or by a digest of the body, by ETag and by the
+    normalized supplied MIME type and *no_sniff*.
+
+    New results are written in batches of *batch_size*, and the oldest ones
+    are evicted to keep at most *max_entries*. Many processes, each with its
+    own store, can use the same database at once, even with sniffers with
+    other options.
+    """
+
+    def __init__(
+        self,
+        path: "Union[str, os.PathLike[str]]",
+        *,
+        sniffer: Optional[Sniffer] = None,
+        max_entries: int = 1_000_000,
+        batch_size: int = 1000,
+        timeout: float = 30.0,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries should be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size should be at least 1")
+        self.sniffer = sniffer or Sniffer()
+        self._options = _options_digest(self.sniffer)
+        self.max_entries = max_entries
+        self.batch_size = batch_size
+        self._pending: Dict[_StoreKey, Optional[bytes]] = {}
+        self._lock = Lock()
+        self._connection = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        try:
+            self._initialize()
+        except BaseException:
+            self._connection.close()
+            raise
+
+    def _initialize(self) -> None:
+        connection = self._connection
+        connection.execute("PRAGMA journal_mode=WAL")
+        with connection:
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute(_CREATE_RESULTS)
+
+    def __enter__(self) -> "SniffStore":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _lookup(self, store_key: _StoreKey) -> object:
+        with self._lock:
+            result = self._pending.get(store_key, _MISSING)
+            if result is _MISSING:
+                row = self._connection.execute(_SELECT, store_key).fetchone()
+                if row is not None:
+                    result = row[0]
+            return result
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.executemany(
+                _INSERT, [(*store_key, result) for store_key, result in self._pending.items()]
+            )
+            self._connection.execute(_EVICT, (self.max_entries,))
+        self._pending.clear()
+
+    def _sniff(
+        self, store_key: _StoreKey, sniff: Callable[[], Optional[bytes]]
+    ) -> Optional[bytes]:
+        result = self._lookup(store_key)
+        if result is not _MISSING:
+            return cast(Optional[bytes], result)
+        mime_type = sniff()
+        with self._lock:
+            self._pending[store_key] = mime_type
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+        return mime_type
+
+    def get(
+        self,
+        key: str,
+        *,
+        etag: Optional[str] = None,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Optional[bytes]:
+        """Return the stored result for *key*, or ``None``."""
+        result = self._lookup(_store_key(self._options, key, etag, content_types, no_sniff))
+        return None if result is _MISSING else cast(Optional[bytes], result)
+
+    def sniff(
+        self,
+        key: str,
+        body: bytes,
+        *,
+        etag: Optional[str] = None,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+        content_encoding: Optional[bytes] = None,
+    ) -> Optional[bytes]:
+        """Return the stored result for *key*, or store and return the result
+        of :meth:`Sniffer.sniff` for *body*."""
+        return self._sniff(
+            _store_key(self._options, key, etag, content_types, no_sniff),
+            lambda: self.sniffer.sniff(
+                body,
+                content_types=content_types,
+                no_sniff=no_sniff,
+                content_encoding=content_encoding,
+            ),
+        )
+
+    def sniff_file(
+        self,
+        key: str,
+        file: BinaryIO,
+        *,
+        etag: Optional[str] = None,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Optional[bytes]:
+        """Return the stored result for *key*, without reading from *file*, or
+        store and return the result of :meth:`Sniffer.sniff_file`."""
+        return self._sniff(
+            _store_key(self._options, key, etag, content_types, no_sniff),
+            lambda: self.sniffer.sniff_file(file, content_types=content_types, no_sniff=no_sniff),
+        )
+
+    def sniff_path(
+        self,
+        key: str,
+        path: "Union[str, bytes, os.PathLike[str], os.PathLike[bytes]]",
+        *,
+        etag: Optional[str] = None,
+        content_types: Optional[Tuple[bytes]] = None,
+        no_sniff: bool = False,
+    ) -> Optional[bytes]:
+        """Return the stored result for *key*, without opening *path*, or
+        store and return the result of :meth:`Sniffer.sniff_path`."""
+        return self._sniff(
+            _store_key(self._options, key, etag, content_types, no_sniff),
+            lambda: self.sniffer.sniff_path(path, content_types=content_types, no_sniff=no_sniff),
+        )
+
+    def flush(self) -> None:
+        """Write the results not written yet."""
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """Write the results not written yet, and close the database."""
+        with self._lock:
+            try:
+                self._flush()
+            finally:
+                self._connection.close()
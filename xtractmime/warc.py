@@ -0,0 +1,220 @@
+"""Sniffing of the payloads of WARC files."""
+import gzip
+import io
+import os
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union, cast
+
+from xtractmime import RESOURCE_HEADER_BUFFER_LENGTH, Sniffer
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_MAX_LINE_LENGTH = 65536
+_SKIP_BUFFER_LENGTH = 65536
+
+_Headers = Dict[bytes, List[bytes]]
+
+
+class WarcRecord(NamedTuple):
+    """MIME type of the payload of a WARC record."""
+
+    record_type: str
+    record_id: Optional[str]
+    target_uri: Optional[str]
+    content_types: Optional[Tuple[bytes, ...]]
+    no_sniff: bool
+    mime_type: Optional[bytes]
+
+
+class _Block:
+    """Reader of the block of a WARC record, which stops at its end."""
+
+    def __init__(self, file: BinaryIO, length: int):
+        self._file = file
+        self.remaining = length
+
+    def read(self, size: int) -> bytes:
+        chunks = []
+        size = min(size, self.remaining)
+        while size:
+            chunk = self._file.read(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+            self.remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def readline(self) -> bytes:
+        line = self._file.readline(min(self.remaining, _MAX_LINE_LENGTH))
+        self.remaining -= len(line)
+        return line
+
+    def skip(self) -> None:
+        if self._file.seekable():
+            self._file.seek(self.remaining, io.SEEK_CUR)
+        else:
+            while self.remaining and self.read(_SKIP_BUFFER_LENGTH):
+                pass
+        self.remaining = 0
+
+
+def _parse_headers(lines: Iterator[bytes]) -> _Headers:
+    headers: _Headers = {}
+    name = None
+    for line in lines:
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if line[:1] in (b" ", b"\t") and name is not None:
+            headers[name][-1] += b" " + line.strip()
+            continue
+        name, separator, value = line.partition(b":")
+        if not separator:
+            name = None
+            continue
+        name = name.strip().lower()
+        headers.setdefault(name, []).append(value.strip())
+    return headers
+
+
+def _read_lines(read_line) -> Iterator[bytes]:
+    while True:
+        line = read_line()
+        yield line
+        if not line:
+            return
+
+
+def _read_chunked(block: _Block, size: int) -> bytes:
+    """Return the first *size* bytes of the chunked transfer coding in
+    *block*."""
+    chunks = []
+    while size:
+        chunk_size_line = block.readline()
+        try:
+            chunk_size = int(chunk_size_line.split(b";", 1)[0], 16)
+        except ValueError:
+            break
+        if not chunk_size:
+            break
+        chunk = block.read(min(chunk_size, size))
+        chunks.append(chunk)
+        size -= len(chunk)
+        if len(chunk) < chunk_size:
+            break
+        block.readline()
+    return b"".join(chunks)
+
+
+def _is_no_sniff(headers: _Headers) -> bool:
+    values = headers.get(b"x-content-type-options")
+    if not values:
+        return False
+    return values[0].split(b",", 1)[0].strip().lower() == b"nosniff"
+
+
+def _is_chunked(headers: _Headers) -> bool:
+    values = headers.get(b"transfer-encoding")
+    if not values:
+        return False
+    return values[-1].rsplit(b",", 1)[-1].strip().lower() == b"chunked"
+
+
+def _header_value(headers: _Headers, name: bytes) -> Optional[str]:
+    values = headers.get(name)
+    return values[0].decode("utf-8", "replace") if values else None
+
+
+def _sniff_record(
+    file: BinaryIO, headers: _Headers, record_type: str, sniffer: Sniffer
+) -> Optional[WarcRecord]:
+    try:
+        length = int(headers[b"content-length"][0])
+    except (KeyError, ValueError):
+        raise ValueError("WARC record without a valid Content-Length header")
+    block = _Block(file, length)
+
+    try:
+        if record_type not in ("response", "resource"):
+            return None
+
+        block_type = headers.get(b"content-type", [b""])[0]
+        if record_type == "response" and block_type.lower().startswith(b"application/http"):
+            block.readline()  # status line
+            http_headers = _parse_headers(_read_lines(block.readline))
+            content_types = tuple(http_headers.get(b"content-type", ())) or None
+            no_sniff = _is_no_sniff(http_headers)
+            if _is_chunked(http_headers):
+                payload = _read_chunked(block, RESOURCE_HEADER_BUFFER_LENGTH)
+            else:
+                payload = block.read(RESOURCE_HEADER_BUFFER_LENGTH)
+        else:
+            content_types = (block_type,) if block_type else None
+            no_sniff = False
+            payload = block.read(RESOURCE_HEADER_BUFFER_LENGTH)
+
+        return WarcRecord(
+            record_type=record_type,
+            record_id=_header_value(headers, b"warc-record-id"),
+            target_uri=_header_value(headers, b"warc-target-uri"),
+            content_types=content_types,
+            no_sniff=no_sniff,
+            mime_type=sniffer.sniff(
+                payload, content_types=cast(Tuple[bytes], content_types), no_sniff=no_sniff
+            ),
+        )
+    finally:
+        block.skip()
+
+
+def _open(file: BinaryIO) -> BinaryIO:
+    """Return *file*, decompressed if it is gzip-compressed."""
+    peek = getattr(file, "peek", None)
+    if peek is not None:
+        magic = peek(len(_GZIP_MAGIC))[: len(_GZIP_MAGIC)]
+    elif file.seekable():
+        position = file.tell()
+        magic = file.read(len(_GZIP_MAGIC))
+        file.seek(position)
+    else:
+        magic = b""
+    if magic == _GZIP_MAGIC:
+        return cast(BinaryIO, gzip.GzipFile(fileobj=file, mode="rb"))
+    return file
+
+
+def _iter_records(file: BinaryIO, sniffer: Sniffer) -> Iterator[WarcRecord]:
+    file = _open(file)
+    while True:
+        line = file.readline(_MAX_LINE_LENGTH)
+        if not line:
+            return
+        if not line.strip():
+            continue
+        if not line.startswith(b"WARC/"):
+            raise ValueError(f"invalid WARC record version line: {line[:64]!r}")
+        headers = _parse_headers(_read_lines(lambda: file.readline(_MAX_LINE_LENGTH)))
+        record_type = _header_value(headers, b"warc-type") or ""
+        record = _sniff_record(file, headers, record_type, sniffer)
+        if record is not None:
+            yield record
+
+
+def sniff_warc(
+    warc: Union[str, bytes, "os.PathLike[str]", "os.PathLike[bytes]", BinaryIO],
+    *,
+    sniffer: Optional[Sniffer] = None,
+) -> Iterator[WarcRecord]:
+    """Yield the MIME type of the payload of each response and resource record
+    of a WARC file, given as a path or a binary file object.
+
+    Gzip-compressed WARC files are decompressed on the fly. For HTTP responses,
+    the ``Content-Type`` and ``X-Content-Type-Options`` headers are used as
+    *content_types* and *no_sniff*. Only the first
+    :data:`~xtractmime.RESOURCE_HEADER_BUFFER_LENGTH` bytes of each payload
+    are read, and the rest is skipped. Options are taken from *sniffer*.
+    """
+    sniffer = sniffer or Sniffer()
+    if isinstance(warc, (str, bytes, os.PathLike)):
+        with open(warc, "rb") as file:
+            yield from _iter_records(file, sniffer)
+    else:
+        yield from _iter_records(warc, sniffer)